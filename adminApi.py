@@ -0,0 +1,256 @@
+# adminApi.py
+# Operational endpoints and CLI commands: bulk doctor import and appointment export.
+# Imports go in as batched executemany inserts; exports stream rows from a server-side
+# cursor straight into the CSV/NDJSON response, so memory stays flat for any date range.
+# HTTP access needs `Authorization: Bearer <ADMIN_TOKEN>`; without ADMIN_TOKEN it is off.
+import csv
+import hmac
+import io
+import json
+import sys
+from datetime import datetime, timedelta
+import click
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from sqlalchemy import insert, select
+from models import db, Appointment, Doctor, DoctorShift
+from availabilityService import build_shift_rows, DEFAULT_SLOT_MINUTES
+from doctorCache import bump_catalog_version
+from appUtils import validate_date
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = ["serial_number", "patient_name", "patient_email", "patient_mobile", "speciality",
+                  "doctor_id", "doctor_name", "appointment_time", "fee", "status"]
+
+admin = Blueprint("admin", __name__, url_prefix="/admin", cli_group=None)
+
+
+# ---------------- doctor import ----------------
+
+def _read_rows(stream, fmt):
+    """(line number, row) pairs from a CSV or JSON-lines text stream; JSON lines come unparsed."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for number, line in enumerate(stream, 1):
+            if line.strip():
+                yield number, line
+
+
+def _parse_row(row):
+    """The row as a dict; a JSON line is parsed here so a bad one is reported against its line."""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e.msg}") from None
+        if not isinstance(row, dict):
+            raise ValueError("each line must be a JSON object")
+    return row
+
+
+def _doctor_values(row):
+    """Validated column values for one roster row, plus its parsed shifts; raises ValueError."""
+    name = (row.get("name") or "").strip()
+    speciality = (row.get("speciality") or "").strip()
+    if not name or not speciality:
+        raise ValueError("name and speciality are required")
+    fee = float(row.get("consultation_fee"))
+    if fee < 0:
+        raise ValueError("consultation_fee must not be negative")
+    slot_minutes = int(row.get("slot_minutes") or DEFAULT_SLOT_MINUTES)
+    if slot_minutes <= 0:
+        raise ValueError("slot_minutes must be positive")
+    working_hours = row.get("working_hours")  # JSON lines only, as in data/doctors.json
+    if working_hours is not None and not isinstance(working_hours, dict):
+        raise ValueError("working_hours must be an object")
+    # parsed here, so a bad time is reported against its line instead of failing the whole batch
+    try:
+        shifts = build_shift_rows(None, working_hours, slot_minutes)
+    except (TypeError, ValueError):
+        raise ValueError('working_hours must map shift names to ["HH:MM", "HH:MM"]') from None
+    for shift in shifts:
+        if shift.end_time <= shift.start_time:
+            raise ValueError(f"shift {shift.name!r} must end after it starts")
+    return {"name": name, "speciality": speciality, "consultation_fee": fee}, shifts
+
+
+def _insert_batch(batch):
+    """Insert one batch of doctors and their shifts with executemany; one short transaction."""
+    ids = db.session.scalars(
+        insert(Doctor).returning(Doctor.id, sort_by_parameter_order=True),
+        [values for values, _ in batch],
+    ).all()
+    shifts = [
+        {"doctor_id": doctor_id, "name": s.name, "start_time": s.start_time,
+         "end_time": s.end_time, "slot_minutes": s.slot_minutes}
+        for doctor_id, (_, doctor_shifts) in zip(ids, batch) for s in doctor_shifts
+    ]
+    db.session.execute(insert(DoctorShift), shifts)
+    # bulk inserts skip ORM events, so move the roster version on explicitly
+    bump_catalog_version(db.session)
+    db.session.commit()
+
+
+def import_doctors(stream, fmt="csv", batch_size=IMPORT_BATCH_SIZE):
+    """Import a doctor roster; doctors already on file (same name and speciality) are skipped.
+
+    Returns {"imported": n, "skipped": n, "errors": [{"line": n, "error": "..."}]}.
+    """
+    known = {(name, speciality) for name, speciality in db.session.execute(select(Doctor.name, Doctor.speciality))}
+    imported, skipped, errors, batch = 0, 0, [], []
+    try:
+        for number, row in _read_rows(stream, fmt):
+            try:
+                values, shifts = _doctor_values(_parse_row(row))
+            except (TypeError, ValueError) as e:
+                errors.append({"line": number, "error": str(e)})
+                continue
+            key = (values["name"], values["speciality"])
+            if key in known:
+                skipped += 1
+                continue
+            known.add(key)
+            batch.append((values, shifts))
+            if len(batch) >= batch_size:
+                _insert_batch(batch)
+                imported += len(batch)
+                batch = []
+    except (csv.Error, UnicodeDecodeError) as e:
+        errors.append({"line": None, "error": f"unreadable input: {e}"})
+    # rows validated before an unreadable stretch of input are still imported
+    if batch:
+        _insert_batch(batch)
+        imported += len(batch)
+    return {"imported": imported, "skipped": skipped, "errors": errors}
+
+
+# ---------------- appointment export ----------------
+
+def _export_query(start=None, end=None, statuses=None):
+    query = (
+        select(Appointment.serial_number, Appointment.patient_name, Appointment.patient_email,
+               Appointment.patient_mobile, Appointment.speciality, Appointment.doctor_id,
+               Doctor.name, Appointment.appointment_time, Appointment.fee, Appointment.status)
+        .join(Doctor, Doctor.id == Appointment.doctor_id)
+        .order_by(Appointment.appointment_time, Appointment.id)
+    )
+    if start:
+        query = query.where(Appointment.appointment_time >= datetime.combine(start, datetime.min.time()))
+    if end:
+        query = query.where(Appointment.appointment_time < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if statuses:
+        query = query.where(Appointment.status.in_(statuses))
+    return query
+
+
+def _csv_text(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def export_appointments(start=None, end=None, statuses=None, fmt="csv", batch_size=EXPORT_BATCH_SIZE):
+    """Yield the export as text chunks, one per `batch_size` rows fetched from a server-side cursor."""
+    result = db.session.execute(
+        _export_query(start, end, statuses),
+        execution_options={"stream_results": True, "yield_per": batch_size},
+    )
+    if fmt == "csv":
+        yield _csv_text([EXPORT_COLUMNS])
+    for rows in result.partitions():
+        rows = [(*row[:7], row[7].isoformat(sep=" "), *row[8:]) for row in rows]
+        if fmt == "csv":
+            yield _csv_text(rows)
+        else:
+            yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+# ---------------- HTTP ----------------
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+@admin.before_request
+def require_admin_token():
+    token = current_app.config.get("ADMIN_TOKEN")
+    if not token:
+        abort(404)
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        abort(401)
+
+
+def _request_format():
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "ndjson" if (request.mimetype or "").endswith(("ndjson", "jsonl")) else "csv"
+    if fmt not in FORMATS:
+        abort(400, f"format must be one of {', '.join(FORMATS)}")
+    return fmt
+
+
+@admin.route("/doctors/import", methods=["POST"])
+def import_doctors_endpoint():
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    return jsonify(import_doctors(stream, _request_format()))
+
+
+@admin.route("/appointments/export")
+def export_appointments_endpoint():
+    fmt = _request_format()
+    bounds = {}
+    for key in ("start", "end"):
+        value = request.args.get(key)
+        if value:
+            bounds[key] = validate_date(value)
+            if bounds[key] is None:
+                abort(400, f"{key} must be YYYY-MM-DD")
+    statuses = [s.strip() for s in request.args.get("status", "").split(",") if s.strip()]
+    chunks = export_appointments(bounds.get("start"), bounds.get("end"), statuses, fmt)
+    filename = f"appointments.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=FORMATS[fmt],
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+# ---------------- CLI ----------------
+
+def _bootstrap():
+    from dbBootstrap import bootstrap_database
+    bootstrap_database(current_app._get_current_object())
+
+
+@admin.cli.command("import-doctors")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Defaults to the file extension.")
+def import_doctors_command(path, fmt):
+    """Bulk-import a doctor roster from a CSV or JSON-lines file."""
+    _bootstrap()
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, encoding="utf-8", newline="") as fh:
+        report = import_doctors(fh, fmt)
+    for error in report["errors"]:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f"Imported {report['imported']} doctor(s), skipped {report['skipped']} already on file.")
+
+
+@admin.cli.command("export-appointments")
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), help="First day, inclusive.")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]), help="Last day, inclusive.")
+@click.option("--status", "statuses", multiple=True, help="Only these statuses; repeatable.")
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), default="csv")
+@click.option("--output", "-o", type=click.Path(dir_okay=False), help="Write here instead of stdout.")
+def export_appointments_command(start, end, statuses, fmt, output):
+    """Stream appointments for a date range and/or status to CSV or NDJSON."""
+    _bootstrap()
+    chunks = export_appointments(start and start.date(), end and end.date(), list(statuses), fmt)
+    out = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
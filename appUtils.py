@@ -1,12 +1,17 @@
 import re
 import random
 from datetime import datetime
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-from openai import OpenAI
-import os
+from llmGateway import get_gateway, LLMUnavailable
+from llmScheduler import get_llm_scheduler
+from responseCache import get_response_cache
+from intentRouter import router, is_emergency
+from triageEngine import get_triage_engine
+from metrics import LLM_ANSWERS, LLM_CALL_SECONDS
+import logging
+import time
+
+log = logging.getLogger("healthbot.llm")
 
-SENDGRID_KEY = os.getenv("SENDGRID_API_KEY")
 # OPENROUTER_KEY=os.getenv("OPENROUTER_API_KEY")
 
 
@@ -19,24 +24,17 @@ def validate_email(email):
 def validate_mobile(mobile):
     return bool(re.fullmatch(r"[6-9]\d{9}", mobile.strip()))
 
+# last 10 digits of a phone number, so "+91 98765-43210" and "9876543210" match
+def normalize_mobile(mobile):
+    digits = re.sub(r"\D", "", mobile or "")
+    return digits[-10:] if len(digits) >= 10 else None
+
 def validate_date(date_str):
     try:
         return datetime.strptime(date_str, "%Y-%m-%d").date()
     except ValueError:
         return None
 
-#for sending the mail using the SendGrid API call
-def send_email(to_email, subject, body):
-    message = Mail(
-        from_email="<PROVIDE YOUR MAIL ID>",  # must be verified in SendGrid
-        to_emails=to_email,
-        subject=subject,
-        plain_text_content=body
-    )
-    sg = SendGridAPIClient(SENDGRID_KEY)
-    response = sg.send(message)
-    print(f"✅ Email sent to {to_email}, Status: {response.status_code}")
-
 # greeting msgs
 def get_greeting_message():
     greetings = [
@@ -91,52 +89,146 @@ Ask simple health queries like:
 # detecting keywords to trigger GenAI model
 def is_health_query(message):
     """Detect if the message is a health-related query."""
-    important_keywords = ["need","medicine","have","think","feel","got","cut","fever", "cough", "pain", "headache", "sore", "throat", "cold", "flu", "sick", "ill","bleeding","blood","clot"]
-    return any(keyword in message.lower() for keyword in important_keywords)
+    match = router.route(message)
+    return match is not None and match.intent == "health"
+
+EMERGENCY_TEXT = ("This seems like a medical emergency. "
+                  "Please call your local emergency number 108/112 "
+                  "or go to the nearest hospital immediately.")
+
+BOOKING_HINT = "You can book an appointment anytime. Just type 'Book appointment'."
+
+def _symptom_names(symptoms):
+    names = [s.name for s in symptoms]
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+
+# offline triage first tier (see triageEngine.py); None when triage is disabled
+def triage_health_query(message):
+    engine = get_triage_engine()
+    return engine.assess(message) if engine else None
+
+def triage_reply(triage, limit=3):
+    """Answer built from the knowledge base: urgency first, then advice and the speciality to see."""
+    symptoms = triage.symptoms[:limit]
+    if triage.urgency == "emergency":
+        first_aid = next(s.advice for s in triage.symptoms if s.urgency == "emergency")
+        return f"🚨 {EMERGENCY_TEXT}\n\nWhile you wait for help: {first_aid}"
+    advice = "\n".join(f"• {s.advice}" for s in symptoms)
+    if triage.urgency == "urgent":
+        return (f"⚠️ {_symptom_names(symptoms).capitalize()} should be checked by a doctor today.\n\n{advice}\n\n"
+                f"👨‍⚕️ Type 'book appointment' to see a {triage.speciality}, or 'emergency' if it gets worse.")
+    return (f"🩺 For {_symptom_names(symptoms)}:\n{advice}\n\n"
+            f"👨‍⚕️ If it does not get better, a {triage.speciality} can help. {BOOKING_HINT}")
 
 #rule based script when GenAI model fails this works fine for common
 def rule_based_health_response(message):
-    """Fallback rule-based response for health queries."""
-    message = message.lower()
-    if "fever" in message:
-        return "Take rest and stay hydrated. Monitor your temperature. If symptoms worsen, consult a healthcare provider. You can book an appointment anytime. Just type 'Book appointment'."
-    elif "cough" in message or "cold" in message:
-        return "Rest, drink warm fluids, and avoid cold exposure. You can book an appointment anytime. Just type 'Book appointment'."
-    elif "bleeding" in message or "blood" in message or "clot" in message:
-        return "Go to medical emergency and need first aid as soon as possible and try to stop the blood. Take help of clean cloth"
-    elif "pain" in message or "headache" in message:
-        return "Rest and consider over-the-counter pain relief if needed. You can book an appointment anytime. Just type 'Book appointment'."
-    elif "a lot" in message or "immediate" in message:
-        return "Immediately go-to near-by hospital. Dial '112' to call immediate assistance or write 'emergency' for emergency assistance."
-    else:
-        return "Please rest and monitor your symptoms. You can book an appointment anytime. Just type 'Book appointment'."
-
-#here is the generative model 
+    """Fallback response for health queries: the triage advice, emergency care, or a generic note."""
+    triage = triage_health_query(message)
+    if triage and triage.symptoms:
+        return triage_reply(triage)
+    # no triage match (or triage off): obvious emergencies still go to emergency care
+    if is_emergency(message):
+        return f"🚨 {EMERGENCY_TEXT}"
+    return f"Please rest and monitor your symptoms. {BOOKING_HINT}"
+
+def _llm_lane(message):
+    # scheduler priority lane: the triage urgency when it matched, else the emergency keywords,
+    # so emergencies are prioritised with triage off or when it missed them
+    triage = triage_health_query(message)
+    if triage and triage.urgency:
+        return triage.urgency
+    return "emergency" if is_emergency(message) else "routine"
+
+def _ticket(message):
+    # the scheduler's claim on an answer, or None when LLM_SCHEDULER=off and the gateway is called directly
+    scheduler = get_llm_scheduler()
+    return scheduler.submit(message, _llm_lane(message)) if scheduler else None
+
+def _record_llm_call(mode, started, source):
+    LLM_CALL_SECONDS.observe(time.perf_counter() - started, mode=mode, outcome="ok" if source == "llm" else "error")
+    LLM_ANSWERS.inc(source=source)
+
+# shared by the four entry points below, so the sync and async paths cannot drift apart
+def _cached(message):
+    """(cache, cached answer); the answer is None on a miss or when the cache is off."""
+    cache = get_response_cache()
+    cached = cache.get(message) if cache else None
+    if cached is not None:
+        LLM_ANSWERS.inc(source="cache")
+    return cache, cached
+
+def _answered(cache, message, response, mode, started):
+    _record_llm_call(mode, started, "llm")
+    # only real LLM answers are cached, never the fallback text
+    if cache:
+        cache.put(message, response)
+    return response
+
+def _fallback(message, error, mode, started):
+    log.warning("LLM unavailable, using rule-based answer: %s", error)
+    _record_llm_call(mode, started, "fallback")
+    return rule_based_health_response(message)
+
+#here is the generative model, called through the shared gateway (see llmGateway.py),
+# queued by the LLM scheduler (see llmScheduler.py) unless LLM_SCHEDULER=off
 def get_llm_response(message):
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=os.getenv("OPENAI_API_KEY"),
-    )
+    cache, cached = _cached(message)
+    if cached is not None:
+        return cached
+    started = time.perf_counter()
+    try:
+        ticket = _ticket(message)
+        response = ticket.result() if ticket else get_gateway().complete(message)
+    except LLMUnavailable as e:
+        return _fallback(message, e, "complete", started)
+    return _answered(cache, message, response, "complete", started)
+
+# streaming variant of get_llm_response: yields text chunks as they arrive
+def stream_llm_response(message):
+    cache, cached = _cached(message)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    started = time.perf_counter()
+    try:
+        for chunk in get_gateway().stream(message):
+            parts.append(chunk)
+            yield chunk
+    except LLMUnavailable as e:
+        fallback = _fallback(message, e, "stream", started)
+        if not parts:
+            yield fallback
+        return
+    _answered(cache, message, "".join(parts), "stream", started)
+
+# async variants for the ASGI entry point (asgi.py); same cache and fallback rules
+async def aget_llm_response(message):
+    cache, cached = _cached(message)
+    if cached is not None:
+        return cached
+    started = time.perf_counter()
+    try:
+        ticket = _ticket(message)
+        response = await ticket.aresult() if ticket else await get_gateway().acomplete(message)
+    except LLMUnavailable as e:
+        return _fallback(message, e, "complete", started)
+    return _answered(cache, message, response, "complete", started)
+
+async def astream_llm_response(message):
+    cache, cached = _cached(message)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    started = time.perf_counter()
     try:
-        completion = client.chat.completions.create(
-            extra_body={},
-            model="nvidia/nemotron-nano-9b-v2:free",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a health assistant. Provide concise advice for health queries (in 2–3 sentences)"
-                },
-                {
-                    "role": "user",
-                    "content": message
-                }
-            ],
-            max_tokens=50,
-            temperature=0.7
-        )
-        response = completion.choices[0].message.content
-        # response+= " You can book an appointment anytime. Just type 'Book appointment'."
-        return response
-    except Exception as e:
-        print(f"[get_llm_response] Error: {e}")
-        return rule_based_health_response(message)
\ No newline at end of file
+        async for chunk in get_gateway().astream(message):
+            parts.append(chunk)
+            yield chunk
+    except LLMUnavailable as e:
+        fallback = _fallback(message, e, "stream", started)
+        if not parts:
+            yield fallback
+        return
+    _answered(cache, message, "".join(parts), "stream", started)
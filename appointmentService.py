@@ -1,8 +1,14 @@
-import re
-from datetime import datetime
-from flask import jsonify
-from models import db, Doctor, Appointment
-from appUtils import send_email, validate_name, validate_email, validate_mobile, validate_date
+import logging
+from datetime import datetime, time
+from sqlalchemy import or_
+from models import db, Appointment, new_serial_number
+from appUtils import validate_name, validate_email, validate_mobile, validate_date, normalize_mobile
+from doctorCache import get_doctor, get_catalog, speciality_for_choice
+from emailOutbox import enqueue_email
+from availabilityService import shift_menu, get_shift, free_slots
+from slotHolds import place_hold, claim_hold, convert_hold, release_hold, hold_minutes
+from flowEngine import FlowEngine, reply, finish
+from specialityRecommender import get_recommender
 
 # basic email msg just for better experience 
 email_msg='''
@@ -16,762 +22,420 @@ Wishing you good health and a speedy recovery! 🌼
 Warm regards,
 Healthcare Assistant Team'''
 
-def parse_slot_to_time(slot_str):
-    """
-    Converts strings like:
-    "09:00-10:00 AM" → datetime.time(9, 0)
-    "11:00-12:00 PM" → datetime.time(11, 0)
-    """
-    # Extract the start time part: "09:00" from "09:00-10:00 AM"
-    match = re.search(r"(\d{2}:\d{2}).*?(AM|PM)", slot_str, re.IGNORECASE)
-    if not match:
-        raise ValueError("Invalid slot format")
-
-    time_24 = match.group(1)   # "09:00", "11:00", etc.
-    am_pm   = match.group(2).upper()
-
-    # Convert 24-hour "HH:MM" + AM/PM → proper time
-    dt = datetime.strptime(f"{time_24} {am_pm}", "%H:%M %p")
-    return dt.time()
-
-def book_appointment(user_id, user_message, user_sessions):
-    if user_id not in user_sessions:
-        user_sessions[user_id] = {"stage": "name"}
-        return jsonify({"response": "What is your name?"})
-
-    session = user_sessions[user_id]
-
-    if session["stage"] == "name":
-        if not validate_name(user_message):
-            return jsonify({"response": "❌ Invalid name. Use only letters & spaces (min 2 chars)."})
-        session["name"] = user_message.strip()
-        session["stage"] = "email"
-        return jsonify({"response": f"Thanks {session['name']}! Please provide your email ID."})
-
-    elif session["stage"] == "email":
-        if not validate_email(user_message):
-            return jsonify({"response": "❌ Invalid email. Please provide a correct format (example@domain.com)."})
-        session["email"] = user_message.strip()
-        session["stage"] = "mobile"
-        return jsonify({"response": "Please enter your mobile number."})
-
-    elif session["stage"] == "mobile":
-        if not validate_mobile(user_message):
-            return jsonify({"response": "❌ Invalid mobile. Enter a 10-digit number starting with 6,7,8,9."})
-        session["mobile"] = user_message.strip()
-        session["stage"] = "speciality"
-        speciality = [
-            "1. General Physician",
-            "2. Cardiologist",
-            "3. Gastroenterologist",
-            "4. Dermatologist"
-        ]
-        return jsonify({"response": "Please select your speciality by typing the number:\n\n" + "\n".join(speciality)})
-
-    elif session["stage"] == "speciality":
-        speciality_map = {
-            "1": "General Physician",
-            "2": "Cardiologist",
-            "3": "Gastroenterologist",
-            "4": "Dermatologist"
-        }
-        if user_message not in speciality_map:
-            return jsonify({"response": "Invalid selection!\n\n"
-                            "Please type only:\n"
-                            "1 → General Physician\n"
-                            "2 → Cardiologist\n"
-                            "3 → Gastroenterologist\n"
-                            "4 → Dermatologist"})
-        session["speciality"] = speciality_map[user_message]
-
-        if user_message in ["1"]:
-            doctors = Doctor.query.filter_by(speciality="General Physician").all()
-        elif user_message == "2":
-            doctors = Doctor.query.filter_by(speciality="Cardiologist").all()
-        elif user_message == "3":
-            doctors = Doctor.query.filter_by(speciality="Gastroenterologist").all()
-        elif user_message == "4":
-            doctors = Doctor.query.filter_by(speciality="Dermatologist").all()
-        else:
-            doctors = Doctor.query.all()
-
-        if not doctors:
-            return jsonify({"response": "❌ No doctors available for this symptom at the moment."})
-
-        session["available_doctors"] = [
-            {"id": d.id, "name": d.name, "speciality": d.speciality} for d in doctors
-        ]
-        session["stage"] = "choose_doctor"
-
-        doctor_list = "\n".join([f"{i+1}. {d.name} ({d.speciality})" for i, d in enumerate(doctors)])
-        return jsonify({
-            "response": f"Please choose a doctor by entering the number:\n{doctor_list}"
-        })
-
-    elif session["stage"] == "choose_doctor":
-        available_doctors = session.get("available_doctors", [])
-        if not available_doctors:
-            return jsonify({"response": "❌ No doctors available. Please restart."})
-
-        if not user_message.isdigit():
-            return jsonify({"response": "❌ Please enter a valid number from the list."})
-
-        choice = int(user_message) - 1
-        if choice < 0 or choice >= len(available_doctors):
-            return jsonify({"response": "❌ Invalid number. Please choose a number from the list."})
-
-        selected_doctor = available_doctors[choice]
-        session["doctor_id"] = selected_doctor["id"]
-        session["stage"] = "date"
-        return jsonify({"response": f"Great choice 👍 {selected_doctor['name']}.\nPlease provide appointment date (YYYY-MM-DD)."})
-
-    elif session["stage"] == "date":
-        date_obj = validate_date(user_message)
-        if not date_obj:
-            return jsonify({"response": "❌ Invalid date format. Use YYYY-MM-DD."})
-        today = datetime.now().date()
-        if date_obj < today:
-            return jsonify({"response": "❌ Invalid date. Please enter a valid date in (YYYY-MM-DD) format."})
-        session["date"] = date_obj
-        session["stage"] = "time"
-        return jsonify({"response": "Thanks. Please choose your preferred slot:\n\n"
-                                "1. Morning (09:00 – 12:00)\n"
-                                "2. Evening (16:00 – 19:00)\n\n"
-                                "Type 1 for Morning or 2 for Evening."})
-
-    elif session["stage"] == "time":
-        if user_message not in ["1", "2"]:
-            return jsonify({
-                "response": "❌ Invalid option. Please type:\n"
-                            "1️⃣ for Morning (09:00 – 12:00)\n"
-                            "2️⃣ for Evening (16:00 – 19:00)"
-            })
-
-        morning_slots = ["09:00-10:00 AM", "10:00-11:00 AM", "11:00 AM-12:00 PM"]
-        evening_slots = ["04:00-05:00 PM", "05:00-06:00 PM", "06:00-07:00 PM"]
-
-        if user_message == "1":
-            session["shift"] = "Morning"
-            slots = morning_slots
-        else:
-            session["shift"] = "Evening"
-            slots = evening_slots
-
-        session["available_slots"] = slots
-        session["stage"] = "slot_choice"
-
-        slot_text = "\n".join([f"{i+1}. {slot}" for i, slot in enumerate(slots)])
-        return jsonify({
-            "response": f"✅ You selected {session['shift']} shift.\n\n"
-                        f"Please choose a time slot:\n{slot_text}\n\n"
-                        "Reply with the slot number."
-        })
-
-    elif session["stage"] == "slot_choice":
-        try:
-            choice = int(user_message.strip())
-            slots = session.get("available_slots", [])
-            if 1 <= choice <= len(slots):
-                chosen_slot = slots[choice - 1]
-                session["time"] = chosen_slot
-
-                time_match = re.match(r"(\d{2}:\d{2})-.* (AM|PM)", chosen_slot)
-                if time_match:
-                    time_str = time_match.group(1)
-                    ampm = time_match.group(2)
-                    dt = datetime.strptime(f"{time_str} {ampm}", "%I:%M %p")
-                    start_time = dt.time()
-                else:
-                    start_time = datetime.strptime("09:00", "%H:%M").time()
-
-                doctor = Doctor.query.get(session["doctor_id"])
-                appointment_datetime = datetime.combine(session["date"], start_time)
-
-                new_appointment = Appointment(
-                    patient_name=session["name"],
-                    patient_email=session["email"],
-                    patient_mobile=session["mobile"],
-                    speciality=session["speciality"],
-                    doctor_id=doctor.id,
-                    appointment_time=appointment_datetime,
-                    fee=doctor.consultation_fee,
-                    status="Pending"
-                )
-                db.session.add(new_appointment)
-                db.session.commit()
-
-                session["appointment_id"] = new_appointment.id
-                session["stage"] = "confirmation"
-
-                details_msg = (
-                    f"⏰ Your appointment is tentatively booked for {session['date']} at {chosen_slot}.\n\n"
-                    f"👤 Patient: {session['name']}\n"
-                    f"👨‍⚕️ Doctor: {doctor.name}\n"
-                    f"💰 Fee: ₹{doctor.consultation_fee}\n\n"
-                    "Reply 'confirm' to finalize or 'no' to cancel."
-                )
-                return jsonify({"response": details_msg})
-            else:
-                return jsonify({"response": f"❌ Invalid slot number. Please choose 1–{len(slots)}."})
-        except ValueError:
-            return jsonify({"response": "❌ Please enter a valid number for the slot."})
-
-    elif session["stage"] == "confirmation":
-        if user_message.lower() in ["confirm", "yes", "y"]:
-            appointment = Appointment.query.get(session["appointment_id"])
-            if appointment:
-                appointment.status = "Confirmed"
-                db.session.commit()
-
-                doctor = Doctor.query.get(appointment.doctor_id)
-                confirmation_msg = (
-                    f"✅ Appointment Confirmed!\n\n"
-                    f" Serial Number: {appointment.serial_number}\n"
-                    f"👤 Patient: {appointment.patient_name}\n"
-                    f"👨‍⚕️ Doctor: {doctor.name}\n"
-                    f"📅 Date: {appointment.appointment_time.date()}\n"
-                    f"⏰ Time: {session['time']}\n"
-                    f"💰 Fee: ₹{appointment.fee}\n\n"
-                )
-                
-                #Send mail feature for booking new appointment
-                # email_status = "📧 A confirmation email will be sent shortly. Kindly check in spam folder too."
-                # try:
-                #     send_email(appointment.patient_email, "Appointment Confirmation - HealthBot", confirmation_msg + email_msg)
-                # except Exception as e:
-                #     print(f"❌ Email sending failed: {e}")
-                #     email_status = "❌ Failed to send confirmation email. Please check your email address or contact support."
-                # confirmation_msg += email_status
-
-                if "appointment_id" in session:
-                    del session["appointment_id"]
-                session["stage"] = "done"
-                return jsonify({"response": confirmation_msg})
-            else:
-                return jsonify({"response": "Error retrieving appointment. Please type 'restart'."})
-
-        elif user_message.lower() in ["no", "n"]:
-            if "appointment_id" in session:
-                appointment = Appointment.query.get(session["appointment_id"])
-                if appointment:
-                    db.session.delete(appointment)
-                    db.session.commit()
-                del session["appointment_id"]
-            session["stage"] = "greeting"
-            return jsonify({"response": "❌ Appointment cancelled. You can type 'restart' to book again."})
-        else:
-            return jsonify({"response": "❌ Please reply with 'confirm' or 'no'. Type 'restart' if needed."})
-
-    return jsonify({"response": "⚠️ Something went wrong. Please type 'restart' to start booking again."})
-
-def cancel_appointment(user_id, user_message, user_sessions):
-    session = user_sessions.get(user_id, {})
-    stage = session.get("stage")
-    print(f"[cancel_appointment] User ID: {user_id}, Stage: {stage}, Message: '{user_message}', Session: {session}")
-
-    try:
-        # First time entering cancel flow
-        if not session or "flow" not in session or session.get("flow") != "cancel":
-            user_sessions[user_id] = {
-                "flow": "cancel",
-                "stage": "choose_method"
-            }
-            return jsonify({
-                "response": (
-                    "To cancel your appointment, please choose:\n\n"
-                    "1 → To Enter Mobile Number\n"
-                    "2 → To Enter Serial Number\n\n"
-                    "Reply with 1 or 2"
-                )
-            })
-
-        # ================== STAGE: Choose Method ==================
-        if stage == "choose_method":
-            if user_message.strip() not in ["1", "2"]:
-                return jsonify({"response": "❌ Invalid Option. Please select within 1 or 2 only."})
-
-            if user_message == "1":
-                session["stage"] = "awaiting_mobile"
-                user_sessions[user_id] = session
-                return jsonify({"response": "Please enter your registered mobile number (10 digits):"})
-
-            else:  # Option 2
-                session["stage"] = "awaiting_serial"
-                user_sessions[user_id] = session
-                return jsonify({"response": "Please enter the exact appointment serial number:"})
-
-        # ================== STAGE: Mobile Number Input ==================
-        if stage == "awaiting_mobile":
-            mobile = user_message.strip()
-            if not (mobile.isdigit() and len(mobile) == 10):
-                return jsonify({"response": "Please enter a valid 10-digit mobile number."})
-
-            # Find active appointments
-            appointments = Appointment.query.filter(
-                Appointment.patient_mobile == mobile,
-                (Appointment.status.is_(None) | (Appointment.status != "Cancelled"))
-            ).order_by(Appointment.appointment_time.desc()).all()
-
-            if not appointments:
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": "No active appointments found for this mobile number."})
-
-            session["mobile"] = mobile
-            session["appointments_list"] = [
-                {
-                    "id": a.id,
-                    "serial": a.serial_number,
-                    "name": a.patient_name,
-                    "doctor_id": a.doctor_id,
-                    "time": a.appointment_time.strftime("%d %b %Y %I:%M %p")
-                }
-                for a in appointments
-            ]
-
-            if len(appointments) == 1:
-                apt = appointments[0]
-                doctor = Doctor.query.get(apt.doctor_id)
-                session["appointment_id"] = apt.id
-                session["stage"] = "confirm_cancel"
-                user_sessions[user_id] = session
-
-                return jsonify({
-                    "response": (
-                        f"Found your appointment:\n\n"
-                        f"Serial: {apt.serial_number}\n\n"
-                        f"👤 Patient: {apt.patient_name}\n"
-                        f"👨‍⚕️ Doctor: {doctor.name} ({doctor.speciality})\n"
-                        f"📅 Date & Time: {apt.appointment_time.strftime('%d %b %Y %I:%M %p')}\n"
-                        f"Cancel this appointment?\nReply: yes or no"
-                    )
-                })
-            else:
-                session["stage"] = "choose_appointment"
-                user_sessions[user_id] = session
-                resp = "Multiple active appointments found:\n\n"
-                for i, apt in enumerate(session["appointments_list"], 1):
-                    doc = Doctor.query.get(apt["doctor_id"])
-                    resp += f"{i}. {apt['name']} → {doc.name}\n   {apt['time']}\n   Serial: {apt['serial']}\n\n"
-                resp += "Reply with the number to cancel:"
-                return jsonify({"response": resp})
-
-        # ================== STAGE: Serial Number Input ==================
-        if stage == "awaiting_serial":
-            serial = user_message.strip()
-            appointment = Appointment.query.filter_by(serial_number=serial).first()
-
-            if not appointment:
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": f"No appointment found with serial: {serial}"})
-
-            if appointment.status and appointment.status.lower() == "cancelled":
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": f"Appointment {serial} is already cancelled."})
-
-            doctor = Doctor.query.get(appointment.doctor_id)
-            session["appointment_id"] = appointment.id
-            session["stage"] = "confirm_cancel"
-            user_sessions[user_id] = session
-
-            return jsonify({
-                "response": (
-                    f"Found appointment:\n\n"
-                    f"Serial: {appointment.serial_number}\n\n"
-                    f"👤Patient: {appointment.patient_name}\n"
-                    f"👨‍⚕️Doctor: {doctor.name} ({doctor.speciality})\n"
-                    f"📅Date & Time: {appointment.appointment_time.strftime('%d %b %Y • %I:%M %p')}\n"
-                    f"Cancel this appointment?\nReply: 'yes' to confirm or 'no' to abort cancellation"
-                )
-            })
-
-        # ================== STAGE: Choose from List (Mobile flow) ==================
-        if stage == "choose_appointment":
-            try:
-                idx = int(user_message.strip()) - 1
-                selected = session["appointments_list"][idx]
-                session["appointment_id"] = selected["id"]
-                session["stage"] = "confirm_cancel"
-                user_sessions[user_id] = session
-
-                return jsonify({
-                    "response": (
-                        f"You selected:\n"
-                        f"Serial Number: {selected['serial']}\n👤Patient: {selected['name']}\n📅Date & Time: {selected['time']}\n\n"
-                        f"Confirm cancellation?\nReply: 'yes' to confirm or 'no' to abort cancellation"
-                    )
-                })
-            except:
-                return jsonify({"response": "❌ Invalid number. Please choose from the list."})
-
-        # ================== STAGE: Final Confirmation ==================
-        if stage == "confirm_cancel":
-            if user_message.lower() in ["yes", "y", "haan", "confirm"]:
-                apt = Appointment.query.get(session["appointment_id"])
-                if not apt:
-                    user_sessions.pop(user_id, None)
-                    return jsonify({"response": "Appointment no longer exists."})
-
-                serial = apt.serial_number
-                apt.status = "Cancelled"
-                db.session.commit()
-
-                try:
-                    send_email(
-                        to=apt.patient_email,
-                        subject="Appointment Cancelled - HealthBot",
-                        body=f"Dear {apt.patient_name},\n\n"
-                             f"Your appointment on {apt.appointment_time.strftime('%d %b %Y at %I:%M %p')}\n"
-                             f"with Dr. {Doctor.query.get(apt.doctor_id).name} has been cancelled.\n\n"
-                             f"Serial: {serial}\n\nThank you."
-                    )
-                except Exception as e:
-                    print(f"[cancel_appointment] Email failed: {e}")
-
-                user_sessions.pop(user_id, None)
-                return jsonify({
-                    "response": f"Appointment {serial} has been successfully cancelled!\n\n"
-                                "Need help with anything else? Write 'help' to see more options"
-                })
-
-            elif user_message.lower() in ["no", "n", "abort"]:
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": "Cancellation cancelled. Your appointment remains active."})
-
-            else:
-                return jsonify({"response": "Please reply 'yes' to cancel or 'no' to keep it."})
-
-    except Exception as e:
-        print(f"[cancel_appointment] Unexpected error: {str(e)}")
-        user_sessions.pop(user_id, None)
-        return jsonify({"response": "An error occurred. Please type 'cancel' to try again."})
-
-def reschedule_appointment(user_id, user_message, user_sessions):
-    session = user_sessions.get(user_id, {})
-    stage = session.get("stage")
-    print(f"[reschedule_appointment] User ID: {user_id}, Stage: {stage}, Message: '{user_message}', Session: {session}")
-
-    try:
-        # First time entering reschedule flow
-        if not session or "flow" not in session or session.get("flow") != "reschedule":
-            user_sessions[user_id] = {
-                "flow": "reschedule",
-                "stage": "choose_method"
-            }
-            return jsonify({
-                "response": (
-                    "To reschedule your appointment, please choose:\n\n"
-                    "1 → To Enter Mobile Number\n"
-                    "2 → To Enter Serial Number\n\n"
-                    "Reply with 1 or 2"
-                )
-            })
-
-        if stage == "choose_method":
-            if user_message.strip() not in ["1", "2"]:
-                return jsonify({"response": "❌ Invalid Option. Please select within 1 or 2 only."})
-
-            if user_message == "1":
-                session["stage"] = "awaiting_mobile"
-                user_sessions[user_id] = session
-                return jsonify({"response": "Please enter your registered mobile number (10 digits wihtout country code):"})
-
-            else:  # Option 2
-                session["stage"] = "awaiting_serial"
-                user_sessions[user_id] = session
-                return jsonify({"response": "Please enter the exact appointment serial number:"})
-
-        elif stage == "awaiting_mobile":
-            mobile = re.sub(r"\D", "", user_message.strip())
-            if len(mobile) < 10:
-                return jsonify({"response": "Please send a valid 10-digit mobile number."})
-
-            mobile = mobile[-10:]  # Take last 10 digits
-
-            # Find active (non-cancelled/non-completed) appointments only
-            appointments = Appointment.query.filter(
-                Appointment.patient_mobile.ilike(f"%{mobile}"),
-                Appointment.status.notin_(["Cancelled", "Completed"])
-            ).order_by(Appointment.appointment_time.desc()).limit(10).all()
-
-            if not appointments:
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": "No active appointments found for this mobile number."})
-
-            # Enrich appointment data with formatted date/time and doctor name
-            appointment_list = []
-            for apt in appointments:
-                doctor = Doctor.query.get(apt.doctor_id)
-                appointment_list.append({
-                    "id": apt.id,
-                    "serial": apt.serial_number,
-                    "name": apt.patient_name,
-                    "doctor_name": doctor.name if doctor else "Unknown Doctor",
-                    "date": apt.appointment_time.strftime("%d %b %Y"),
-                    "time": apt.appointment_time.strftime("%I:%M %p"),
-                    "datetime": apt.appointment_time.strftime("%d %b %Y %I:%M %p"),
-                    "apt_object": apt
-                })
-
-            session["found_appointments"] = appointment_list
-
-            if len(appointments) == 1:
-                apt = appointments[0]
-                doctor = Doctor.query.get(apt.doctor_id)
-                doctor_name = doctor.name if doctor else "Unknown Doctor"
-
-                session["serial_number"] = apt.serial_number
-                session["stage"] = "confirm_reschedule"
-
-                msg = (
-                    f"Found your appointment:\n\n"
-                    f"Serial Number: {apt.serial_number}\n"
-                    f"👤 Patient: {apt.patient_name}\n"
-                    f"👨‍⚕️ Doctor: {doctor_name}\n"
-                    f"📅 Date: {apt.appointment_time.strftime('%d %b %Y')}\n"
-                    f"⏰ Time: {apt.appointment_time.strftime('%I:%M %p')}\n\n"
-                    f"Reply *yes* to reschedule or *no* to cancel this appointment."
-                )
-            else:
-                session["stage"] = "choose_appointment"
-                options = "\n\n".join(
-                    f"{i+1}. Serial: *{apt['serial']}*\n"
-                    f"   👤 {apt['name']}\n"
-                    f"   👨‍⚕️ {apt['doctor_name']}\n"
-                    f"   📅 {apt['date']} at {apt['time']}"
-                    for i, apt in enumerate(appointment_list)
-                )
-                msg = (
-                    f"Found {len(appointments)} active appointment(s):\n\n"
-                    f"{options}\n\n"
-                    f"Please reply with the number (1-{len(appointments)}) to select the appointment you want to reschedule/cancel."
-                )
-            user_sessions[user_id] = session
-            return jsonify({"response": msg})
-
-        elif stage == "choose_appointment":
-            try:
-                idx = int(user_message.strip()) - 1
-                apts = session.get("found_appointments", [])
-                if 0 <= idx < len(apts):
-                    selected = apts[idx]
-                    appointment = Appointment.query.filter_by(serial_number=selected["serial"]).first()
-                    if not appointment:
-                        return jsonify({"response": "Appointment no longer exists."})
-
-                    session["serial_number"] = selected["serial"]
-                    session["stage"] = "confirm_reschedule"
-                    user_sessions[user_id] = session
-
-                    doctor = Doctor.query.get(appointment.doctor_id)
-                    msg = (
-                        f"Selected:\n\n"
-                        f"Serial Number: {appointment.serial_number}\n"
-                        f"👤 Patient: {appointment.patient_name}\n"
-                        f"👨‍⚕️ Doctor: {doctor.name}\n"
-                        f"📅 Date: {appointment.appointment_time.date()}\n"
-                        f"⏰ Time: {appointment.appointment_time.strftime('%I:%M %p')}\n\n"
-                        "Reply 'yes' to reschedule or 'no' to abort."
-                    )
-                    return jsonify({"response": msg})
-                else:
-                    return jsonify({"response": f"Please choose a number from 1 to {len(apts)}."})
-            except:
-                return jsonify({"response": "Invalid input. Please reply with a number."})
-
-        elif stage == "awaiting_serial":
-            serial = user_message.strip()
-            if not serial:
-                return jsonify({"response": "Please send a valid serial number."})
-
-            appointment = Appointment.query.filter_by(serial_number=serial).first()
-            if not appointment:
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": f"No appointment found with serial '{serial}'."})
-
-            if appointment.status and appointment.status.lower() in ["cancelled", "completed"]:
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": f"This appointment is already {appointment.status}."})
-
-            doctor = Doctor.query.get(appointment.doctor_id)
-            if not doctor:
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": "Doctor not found. Please try again."})
-
-            session["serial_number"] = serial
-            session["stage"] = "confirm_reschedule"
-            user_sessions[user_id] = session
-
-            details_msg = (
-                f"Found appointment:\n\n"
-                f"Serial Number: {appointment.serial_number}\n"
-                f"👤 Patient: {appointment.patient_name}\n"
-                f"👨‍⚕️ Doctor: {doctor.name}\n"
-                f"Speciality: {doctor.speciality}\n"
-                f"📅 Date: {appointment.appointment_time.date()}\n"
-                f"⏰Time: {appointment.appointment_time.strftime('%I:%M %p')}\n\n"
-                "Reply 'yes' to reschedule or 'no' to abort."
-            )
-            return jsonify({"response": details_msg})
- 
-        elif stage == "confirm_reschedule":
-            if user_message.lower() in ["yes", "y", "confirm"]:
-                session["stage"] = "date"
-                user_sessions[user_id] = session
-                return jsonify({"response": "Please provide the new date (YYYY-MM-DD format)"})
-
-            elif user_message.lower() in ["no", "n", "abort", "cancel"]:
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": "Rescheduling cancelled. Your original appointment remains unchanged."})
-
-            return jsonify({"response": "Please reply 'yes' to confirm or 'no' to abort."})
-
-        elif stage == "date":
-            date_obj = validate_date(user_message)
-            if not date_obj:
-                return jsonify({"response": "Invalid date format. Use YYYY-MM-DD."})
-            if date_obj < datetime.now().date():
-                return jsonify({"response": "Cannot select past date."})
-            session["date"] = date_obj
-            session["stage"] = "time"
-            user_sessions[user_id] = session
-            return jsonify({"response": "Please choose preferred slot:\n\n1. Morning (09:00 – 12:00)\n2. Evening (16:00 – 19:00)\n\nType 1 or 2"})
-
-        elif stage == "time":
-            if user_message not in ["1", "2"]:
-                return jsonify({"response": "Please type 1 for Morning or 2 for Evening."})
-            slots = ["09:00-10:00 AM", "10:00-11:00 AM", "11:00 AM-12:00 PM"] if user_message == "1" else ["04:00-05:00 PM", "05:00-06:00 PM", "06:00-07:00 PM"]
-            session["shift"] = "Morning" if user_message == "1" else "Evening"
-            session["available_slots"] = slots
-            session["stage"] = "slot_choice"
-            user_sessions[user_id] = session
-            slot_text = "\n".join(f"{i+1}. {s}" for i, s in enumerate(slots))
-            return jsonify({"response": f"{session['shift']} slots:\n\n{slot_text}\n\nReply with the number."})
-
-        elif stage == "slot_choice":
-            serial_number = session.get("serial_number")
-            if not serial_number:
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": "Session error. Type 'restart'."})
-
-            slots = session.get("available_slots", [])
-            try:
-                choice = int(user_message.strip())
-                if not (1 <= choice <= len(slots)):
-                    raise ValueError()
-
-                chosen_slot = slots[choice - 1]
-                session["time"] = chosen_slot
-
-                start_time = parse_slot_to_time(chosen_slot)
-                appointment = Appointment.query.filter_by(serial_number=serial_number).first()
-                if not appointment:
-                    user_sessions.pop(user_id, None)
-                    return jsonify({"response": "Appointment not found."})
-
-                doctor = Doctor.query.get(appointment.doctor_id)
-                if not doctor:
-                    user_sessions.pop(user_id, None)
-                    return jsonify({"response": "Doctor not found."})
-                appointment_datetime = datetime.combine(session["date"], start_time)
-                appointment.appointment_time = appointment_datetime
-                appointment.status = "Pending"
-                db.session.commit()
-
-                session["appointment_id"] = appointment.id
-                session["stage"] = "confirmation"
-                user_sessions[user_id] = session
-
-                details_msg = (
-                    f"Appointment tentatively rescheduled:\n\n"
-                    f"👨‍⚕️ Doctor: {doctor.name}\n"
-                    f"📅 Date: {appointment.appointment_time.date()}\n"
-                    f"⏰ Time: {session['time']}\n\n\n"
-                    "Reply 'confirm' to finalize or 'no' to abort."
-                )
-                return jsonify({"response": details_msg})
-            except ValueError:
-                print(f"[reschedule_appointment] Invalid slot input: {user_message}")
-                return jsonify({"response": "❌ Please enter a valid number for the slot."})
-        
-        elif stage == "confirmation":
-            appointment_id = session.get("appointment_id")
-            serial_number = session.get("serial_number")
-            if not appointment_id or not serial_number:
-                print(f"[reschedule_appointment] Missing appointment_id or serial_number in session for user {user_id}, Session: {session}")
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": "❌ Session error: Missing appointment details. Please type 'restart'."})
-
-            appointment = Appointment.query.get(appointment_id)
-            if not appointment:
-                print(f"[reschedule_appointment] Appointment not found for ID: {appointment_id}, Serial: {serial_number}")
-                user_sessions.pop(user_id, None)
-                return jsonify({"response": "Error retrieving appointment. Please type 'restart'."})
-
-            if user_message.lower() in ["confirm", "yes", "y"]:
-                appointment.status = "Confirmed"
-                try:
-                    db.session.commit()
-                    print(f"[reschedule_appointment] Appointment confirmed: {appointment.serial_number}")
-                except Exception as e:
-                    print(f"[reschedule_appointment] Database commit failed in confirmation: {str(e)}")
-                    db.session.rollback()
-                    user_sessions.pop(user_id, None)
-                    return jsonify({"response": f"❌ Database error: {str(e)}. Please type 'restart'."})
-
-                doctor = Doctor.query.get(appointment.doctor_id)
-                if not doctor:
-                    print(f"[reschedule_appointment] Doctor not found for ID: {appointment.doctor_id}")
-                    user_sessions.pop(user_id, None)
-                    return jsonify({"response": "❌ Doctor not found. Please type 'restart'."})
-
-                confirmation_msg = (
-                    f"✅ Appointment Rescheduled!\n\n"
-                    f" Serial Number: {appointment.serial_number}\n"
-                    f"👤 Patient: {appointment.patient_name}\n"
-                    f"👨‍⚕️ Doctor: {doctor.name}\n"
-                    f"📅 Date: {appointment.appointment_time.date()}\n"
-                    f"⏰ Time: {session['time']}\n"
-                    f"💰 Fee: ₹{appointment.fee}\n\n"
-                )
-
-                # mail sending for rescheduling appointment
-                # email_status = "📧 A confirmation email will be sent shortly. Kindly check in spam folder too."
-                # try:
-                #     send_email(appointment.patient_email, "Appointment Reschedule Confirmation - HealthBot", confirmation_msg + email_msg)
-                #     print(f"[reschedule_appointment] Email sent to {appointment.patient_email}")
-                # except Exception as e:
-                #     print(f"[reschedule_appointment] Email sending failed: {e}")
-                #     email_status = "❌ Failed to send confirmation email. Please check your email address or contact support."
-
-                # confirmation_msg += email_status
-
-                user_sessions.pop(user_id, None)
-                print(f"[reschedule_appointment] Session cleared for user {user_id}")
-                return jsonify({"response": confirmation_msg})
-
-            elif user_message.lower() in ["no", "n"]:
-                appointment.status = "Confirmed"  # Revert to original status
-                try:
-                    db.session.commit()
-                    print(f"[reschedule_appointment] Reverted appointment status to Confirmed: {appointment.serial_number}")
-                except Exception as e:
-                    print(f"[reschedule_appointment] Database commit failed in revert: {str(e)}")
-                    db.session.rollback()
-                    user_sessions.pop(user_id, None)
-                    return jsonify({"response": f"❌ Database error: {str(e)}. Please type 'restart'."})
-
-                user_sessions.pop(user_id, None)
-                print(f"[reschedule_appointment] Rescheduling cancelled, session cleared for user {user_id}")
-                return jsonify({"response": "Rescheduling cancelled. The original appointment remains unchanged."})
-            else:
-                print(f"[reschedule_appointment] Invalid confirmation input: {user_message}")
-                return jsonify({"response": "❌ Please reply with 'confirm' or 'no'. Type 'restart' if needed."})
-        
-        else:
-            user_sessions.pop(user_id, None)
-            return jsonify({"response": "Session expired or invalid state. Type 'reschedule' to start again."})
-
-    except Exception as e:
-        print(f"[reschedule_appointment] ERROR: {str(e)}")
-        user_sessions.pop(user_id, None)
-        return jsonify({"response": "Sorry, something went wrong. Type 'reschedule' to try again."})
\ No newline at end of file
+log = logging.getLogger("healthbot.flows")
+
+# symptom-based doctor recommendation: at most this many specialities, the runner-up only if this likely
+RECOMMEND_SPECIALITIES = 2
+RECOMMEND_MIN_PROBABILITY = 0.25
+
+flows = FlowEngine(on_error=lambda: db.session.rollback())
+
+METHOD_MENU = (
+    "1 → To Enter Mobile Number\n"
+    "2 → To Enter Serial Number\n\n"
+    "Please response with 1 or 2 only."
+)
+
+flows.flow("book", start="name", intro="What is your name?",
+           error="⚠️ Something went wrong. Please type 'restart' to start booking again.")
+flows.flow("cancel", start="choose_method", intro="To cancel your appointment, please choose:\n\n" + METHOD_MENU,
+           error="An error occurred. Please type 'cancel' to try again.")
+flows.flow("reschedule", start="choose_method", intro="To reschedule your appointment, please choose:\n\n" + METHOD_MENU,
+           error="Sorry, something went wrong. Type 'reschedule' to try again.")
+
+# Steps receive a SessionState (sessionStore.py): only ids and primitives such as doctor
+# and appointment ids, the chosen date and the open slot start times. Display text is
+# rebuilt from them.
+
+# ---------------- booking: patient details and doctor ----------------
+
+@flows.step("name", "book")
+def ask_name(state, message):
+    if not validate_name(message):
+        return reply("❌ Invalid name. Use only letters & spaces (min 2 chars).")
+    state.name = message.strip()
+    return reply(f"Thanks {state.name}! Please provide your email ID.", stage="email")
+
+@flows.step("email", "book")
+def ask_email(state, message):
+    if not validate_email(message):
+        return reply("❌ Invalid email. Please provide a correct format (example@domain.com).")
+    state.email = message.strip()
+    return reply("Please enter your mobile number.", stage="mobile")
+
+@flows.step("mobile", "book")
+def ask_mobile(state, message):
+    if not validate_mobile(message):
+        return reply("❌ Invalid mobile. Enter a 10-digit number starting with 6,7,8,9.")
+    state.mobile = message.strip()
+    catalog = get_catalog()
+    if not catalog.specialities:
+        return finish("❌ No doctors available at the moment. Please try again later.")
+    return reply("Please describe your symptoms (e.g. “skin rash and itching”), "
+                 "or select a speciality by typing the number:\n\n" + catalog.speciality_menu, stage="speciality")
+
+def _recommended_specialities(message, catalog):
+    """Specialities on the roster that fit the symptoms, best first: the top one, plus a close runner-up."""
+    recommender = get_recommender()
+    ranked = [(s, p) for s, p in (recommender.rank(message) if recommender else []) if s in catalog.by_speciality]
+    return [s for i, (s, p) in enumerate(ranked[:RECOMMEND_SPECIALITIES]) if i == 0 or p >= RECOMMEND_MIN_PROBABILITY]
+
+@flows.step("speciality", "book", free_text=True)
+def ask_speciality(state, message):
+    # served from the in-memory doctor catalog; this stage never touches the database
+    catalog = get_catalog()
+    if message.strip().isdigit():
+        speciality = speciality_for_choice(message, catalog)
+        if speciality is None:
+            return reply("Invalid selection!\n\n"
+                         "Please type only:\n" + catalog.speciality_help)
+        state.speciality = speciality
+        state.doctor_ids = tuple(d.id for d in catalog.by_speciality[speciality])
+        return reply(f"Please choose a doctor by entering the number:\n{catalog.doctor_menus[speciality]}",
+                     stage="choose_doctor")
+
+    specialities = _recommended_specialities(message, catalog)
+    if not specialities:
+        return reply("I couldn't match those symptoms to a speciality. "
+                     "Please select one by typing the number:\n" + catalog.speciality_help)
+    state.speciality = specialities[0]
+    doctors = [d for s in specialities for d in catalog.by_speciality[s]]
+    state.doctor_ids = tuple(d.id for d in doctors)
+    if len(specialities) == 1:
+        menu = catalog.doctor_menus[specialities[0]]
+    else:
+        menu = "\n".join(f"{i}. {d.name} ({d.speciality})" for i, d in enumerate(doctors, 1))
+    return reply(f"🩺 Based on your symptoms we recommend a {' or a '.join(specialities)}.\n\n"
+                 f"Please choose a doctor by entering the number:\n{menu}", stage="choose_doctor")
+
+@flows.step("choose_doctor", "book")
+def ask_doctor(state, message):
+    doctor_ids = state.doctor_ids
+    if not doctor_ids:
+        return reply("❌ No doctors available. Please restart.")
+    if not message.isdigit():
+        return reply("❌ Please enter a valid number from the list.")
+    choice = int(message) - 1
+    if choice < 0 or choice >= len(doctor_ids):
+        return reply("❌ Invalid number. Please choose a number from the list.")
+
+    state.doctor_id = doctor_ids[choice]
+    state.doctor_ids = ()
+    doctor = get_doctor(state.doctor_id)
+    state.speciality = doctor.speciality  # a recommendation may list more than one speciality
+    return reply(f"Great choice 👍 {doctor.name}.\nPlease provide appointment date (YYYY-MM-DD).", stage="date")
+
+# ---------------- shared scheduling steps: date -> shift -> slot ----------------
+
+def _offer_slots(state):
+    """Store the open slot start times for the state's doctor, date and shift; return their labels."""
+    _, slots = get_shift(state.doctor_id, state.shift_choice)
+    open_slots = free_slots(state.doctor_id, state.date, slots)
+    state.slot_starts = tuple(start.hour * 60 + start.minute for _, start in open_slots)
+    return [label for label, _ in open_slots]
+
+def _slot_list(labels):
+    return "\n".join(f"{i+1}. {label}" for i, label in enumerate(labels))
+
+def _slot_taken(state):
+    labels = _offer_slots(state)
+    if not labels:
+        return reply("❌ Sorry, that slot was just booked and this shift is now full.\n"
+                     "Please choose another shift:\n" + shift_menu(state.doctor_id), stage="time")
+    return reply(f"❌ Sorry, that slot was just booked. Please choose another:\n{_slot_list(labels)}", stage="slot_choice")
+
+@flows.step("date", "book", "reschedule")
+def ask_date(state, message):
+    date_obj = validate_date(message)
+    if not date_obj:
+        return reply("❌ Invalid date format. Use YYYY-MM-DD.")
+    if date_obj < datetime.now().date():
+        return reply("❌ Invalid date. Please enter a valid date in (YYYY-MM-DD) format.")
+    state.date = date_obj
+    return reply("Thanks. Please choose your preferred slot:\n\n"
+                 f"{shift_menu(state.doctor_id)}\n\n"
+                 "Reply with the shift number.", stage="time")
+
+@flows.step("time", "book", "reschedule")
+def ask_shift(state, message):
+    shift = get_shift(state.doctor_id, message)
+    if not shift:
+        return reply("❌ Invalid option. Please type:\n" + shift_menu(state.doctor_id))
+    state.shift = shift[0]
+    state.shift_choice = message
+    labels = _offer_slots(state)
+    if not labels:
+        return reply(f"❌ No free slots left in the {state.shift} shift on {state.date}.\n"
+                     "Please choose another shift:\n" + shift_menu(state.doctor_id))
+    return reply(f"✅ You selected {state.shift} shift.\n\n"
+                 f"Please choose a time slot:\n{_slot_list(labels)}\n\n"
+                 "Reply with the slot number.", stage="slot_choice")
+
+@flows.step("slot_choice", "book", "reschedule")
+def ask_slot(state, message):
+    starts = state.slot_starts
+    if not message.strip().isdigit():
+        return reply("❌ Please enter a valid number for the slot.")
+    choice = int(message.strip())
+    if not 1 <= choice <= len(starts):
+        return reply(f"❌ Invalid slot number. Please choose 1–{len(starts)}.")
+
+    state.slot_start = starts[choice - 1]
+    start_time = time(*divmod(state.slot_start, 60))
+    _, slots = get_shift(state.doctor_id, state.shift_choice)
+    state.time = next(label for start, label in slots if start == start_time)
+    return _SLOT_HOLDERS[state.flow](state, _chosen_slot(state))
+
+def _chosen_slot(state):
+    return datetime.combine(state.date, time(*divmod(state.slot_start, 60)))
+
+# Choosing a slot only places an expiring hold (slotHolds.py); the appointment itself is
+# written or moved when the patient confirms.
+
+def _hold_new_booking(state, when):
+    hold = place_hold(state.doctor_id, when)
+    if hold is None:
+        return _slot_taken(state)
+
+    doctor = get_doctor(state.doctor_id)
+    state.hold_id = hold.id
+    state.slot_starts = ()
+    return reply(
+        f"⏰ Your appointment is tentatively booked for {state.date} at {state.time}.\n\n"
+        f"👤 Patient: {state.name}\n"
+        f"👨‍⚕️ Doctor: {doctor.name}\n"
+        f"💰 Fee: ₹{doctor.consultation_fee}\n\n"
+        f"The slot is held for you for {hold_minutes()} minutes.\n"
+        "Reply 'confirm' to finalize or 'no' to cancel.",
+        stage="confirmation",
+    )
+
+def _hold_reschedule(state, when):
+    appointment = db.session.get(Appointment, state.appointment_id)
+    if not appointment:
+        return finish("Appointment not found.")
+    hold = place_hold(appointment.doctor_id, when, appointment.id)
+    if hold is None:
+        return _slot_taken(state)
+
+    state.hold_id = hold.id
+    state.slot_starts = ()
+    return reply(
+        f"Appointment tentatively rescheduled:\n\n"
+        f"👨‍⚕️ Doctor: {appointment.doctor.name}\n"
+        f"📅 Date: {state.date}\n"
+        f"⏰ Time: {state.time}\n\n"
+        f"The new slot is held for you for {hold_minutes()} minutes.\n\n"
+        "Reply 'confirm' to finalize or 'no' to abort.",
+        stage="confirmation",
+    )
+
+_SLOT_HOLDERS = {"book": _hold_new_booking, "reschedule": _hold_reschedule}
+
+def _lost_hold(state):
+    state.hold_id = 0
+    return _slot_taken(state)
+
+# ---------------- booking: confirmation ----------------
+
+@flows.step("confirmation", "book")
+def confirm_booking(state, message):
+    if message.lower() in ["confirm", "yes", "y"]:
+        hold = claim_hold(state.hold_id, state.doctor_id, _chosen_slot(state))
+        if hold is None:
+            return _lost_hold(state)
+        doctor = get_doctor(state.doctor_id)
+        appointment = Appointment(
+            serial_number=new_serial_number(),
+            patient_name=state.name,
+            patient_email=state.email,
+            patient_mobile=state.mobile,
+            speciality=state.speciality,
+            doctor_id=doctor.id,
+            appointment_time=hold.slot_time,
+            fee=doctor.consultation_fee,
+            status="Confirmed"
+        )
+        confirmation_msg = (
+            f"✅ Appointment Confirmed!\n\n"
+            f" Serial Number: {appointment.serial_number}\n"
+            f"👤 Patient: {appointment.patient_name}\n"
+            f"👨‍⚕️ Doctor: {doctor.name}\n"
+            f"📅 Date: {appointment.appointment_time.date()}\n"
+            f"⏰ Time: {state.time}\n"
+            f"💰 Fee: ₹{appointment.fee}\n\n"
+        )
+        # everything is staged first so the write transaction is just the inserts and the commit;
+        # the email is queued with the appointment and delivered by the outbox worker
+        enqueue_email(appointment.patient_email, "Appointment Confirmation - HealthBot", confirmation_msg + email_msg)
+        if not convert_hold(hold, appointment):
+            return _lost_hold(state)
+        return finish(confirmation_msg + "📧 A confirmation email will be sent shortly. Kindly check in spam folder too.")
+
+    elif message.lower() in ["no", "n"]:
+        release_hold(state.hold_id)
+        return finish("❌ Appointment cancelled. You can type 'restart' to book again.")
+    return reply("❌ Please reply with 'confirm' or 'no'. Type 'restart' if needed.")
+
+# ---------------- cancel / reschedule: find the appointment ----------------
+
+# per flow: statuses that can no longer be changed, the confirm stage and its question
+_LOOKUP = {
+    "cancel": (("Cancelled",), "confirm_cancel",
+               "Cancel this appointment?\nReply: 'yes' to confirm or 'no' to abort cancellation"),
+    "reschedule": (("Cancelled", "Completed"), "confirm_reschedule",
+                   "Reply 'yes' to reschedule or 'no' to abort."),
+}
+
+def _is_closed(state, appointment):
+    return appointment.status in _LOOKUP[state.flow][0]
+
+def _select(state, appointment, heading="Found appointment:"):
+    _, confirm_stage, question = _LOOKUP[state.flow]
+    doctor = appointment.doctor
+    state.appointment_id = appointment.id
+    state.doctor_id = appointment.doctor_id
+    state.appointment_ids = ()
+    return reply(
+        f"{heading}\n\n"
+        f"Serial Number: {appointment.serial_number}\n"
+        f"👤 Patient: {appointment.patient_name}\n"
+        f"👨‍⚕️ Doctor: {doctor.name} ({doctor.speciality})\n"
+        f"📅 Date & Time: {appointment.appointment_time.strftime('%d %b %Y %I:%M %p')}\n\n"
+        f"{question}",
+        stage=confirm_stage,
+    )
+
+@flows.step("choose_method", "cancel", "reschedule")
+def ask_lookup_method(state, message):
+    if message.strip() == "1":
+        return reply("Please enter your registered mobile number (10 digits):", stage="awaiting_mobile")
+    if message.strip() == "2":
+        return reply("Please enter the exact appointment serial number:", stage="awaiting_serial")
+    return reply("❌ Invalid Option. Please select within 1 or 2 only.")
+
+@flows.step("awaiting_mobile", "cancel", "reschedule")
+def find_by_mobile(state, message):
+    mobile = normalize_mobile(message)
+    if not mobile:
+        return reply("Please enter a valid 10-digit mobile number.")
+
+    closed = _LOOKUP[state.flow][0]
+    appointments = Appointment.query.filter(
+        Appointment.mobile_last10 == mobile,
+        or_(Appointment.status.is_(None), Appointment.status.notin_(closed))
+    ).order_by(Appointment.appointment_time.desc()).limit(10).all()
+
+    if not appointments:
+        return finish("No active appointments found for this mobile number.")
+    if len(appointments) == 1:
+        return _select(state, appointments[0], "Found your appointment:")
+
+    state.appointment_ids = tuple(a.id for a in appointments)
+    options = "\n\n".join(
+        f"{i}. Serial: {a.serial_number}\n"
+        f"   👤 {a.patient_name} → {a.doctor.name}\n"
+        f"   📅 {a.appointment_time.strftime('%d %b %Y %I:%M %p')}"
+        for i, a in enumerate(appointments, 1)
+    )
+    return reply(
+        f"Found {len(appointments)} active appointment(s):\n\n{options}\n\n"
+        f"Please reply with the number (1-{len(appointments)}) to select the appointment.",
+        stage="choose_appointment",
+    )
+
+@flows.step("choose_appointment", "cancel", "reschedule")
+def choose_from_list(state, message):
+    ids = state.appointment_ids
+    if not message.strip().isdigit() or not 1 <= int(message) <= len(ids):
+        return reply(f"❌ Invalid number. Please choose a number from 1 to {len(ids)}.")
+    appointment = db.session.get(Appointment, ids[int(message) - 1])
+    if not appointment or _is_closed(state, appointment):
+        return finish("Appointment no longer exists.")
+    return _select(state, appointment, "You selected:")
+
+@flows.step("awaiting_serial", "cancel", "reschedule")
+def find_by_serial(state, message):
+    serial = message.strip()
+    if not serial:
+        return reply("Please send a valid serial number.")
+    appointment = Appointment.query.filter_by(serial_number=serial).first()
+    if not appointment:
+        return finish(f"No appointment found with serial: {serial}")
+    if _is_closed(state, appointment):
+        return finish(f"Appointment {serial} is already {appointment.status.lower()}.")
+    return _select(state, appointment)
+
+# ---------------- cancel: confirmation ----------------
+
+@flows.step("confirm_cancel", "cancel")
+def confirm_cancel(state, message):
+    if message.lower() in ["yes", "y", "haan", "confirm"]:
+        apt = db.session.get(Appointment, state.appointment_id)
+        if not apt:
+            return finish("Appointment no longer exists.")
+
+        serial = apt.serial_number
+        apt.status = "Cancelled"
+        enqueue_email(
+            apt.patient_email,
+            "Appointment Cancelled - HealthBot",
+            f"Dear {apt.patient_name},\n\n"
+            f"Your appointment on {apt.appointment_time.strftime('%d %b %Y at %I:%M %p')}\n"
+            f"with {apt.doctor.name} has been cancelled.\n\n"
+            f"Serial: {serial}\n\nThank you."
+        )
+        db.session.commit()
+        return finish(f"Appointment {serial} has been successfully cancelled!\n\n"
+                      "Need help with anything else? Write 'help' to see more options")
+
+    elif message.lower() in ["no", "n", "abort"]:
+        return finish("Cancellation cancelled. Your appointment remains active.")
+    return reply("Please reply 'yes' to cancel or 'no' to keep it.")
+
+# ---------------- reschedule: confirmation ----------------
+
+@flows.step("confirm_reschedule", "reschedule")
+def confirm_reschedule_start(state, message):
+    if message.lower() in ["yes", "y", "confirm"]:
+        return reply("Please provide the new date (YYYY-MM-DD format)", stage="date")
+    elif message.lower() in ["no", "n", "abort", "cancel"]:
+        return finish("Rescheduling cancelled. Your original appointment remains unchanged.")
+    return reply("Please reply 'yes' to confirm or 'no' to abort.")
+
+@flows.step("confirmation", "reschedule")
+def confirm_reschedule(state, message):
+    appointment = db.session.get(Appointment, state.appointment_id)
+    if not appointment:
+        log.warning("Appointment %s vanished before reschedule confirmation", state.appointment_id)
+        return finish("Error retrieving appointment. Please type 'restart'.")
+
+    if message.lower() in ["confirm", "yes", "y"]:
+        hold = claim_hold(state.hold_id, appointment.doctor_id, _chosen_slot(state), appointment.id)
+        if hold is None:
+            return _lost_hold(state)
+        serial = appointment.serial_number
+        confirmation_msg = (
+            f"✅ Appointment Rescheduled!\n\n"
+            f" Serial Number: {serial}\n"
+            f"👤 Patient: {appointment.patient_name}\n"
+            f"👨‍⚕️ Doctor: {appointment.doctor.name}\n"
+            f"📅 Date: {hold.slot_time.date()}\n"
+            f"⏰ Time: {state.time}\n"
+            f"💰 Fee: ₹{appointment.fee}\n\n"
+        )
+        # move, status change and confirmation email commit together in one short transaction
+        enqueue_email(appointment.patient_email, "Appointment Reschedule Confirmation - HealthBot", confirmation_msg + email_msg)
+        appointment.appointment_time = hold.slot_time
+        appointment.status = "Confirmed"
+        if not convert_hold(hold, appointment):
+            return _lost_hold(state)
+        log.info("Appointment %s rescheduled", serial)
+        return finish(confirmation_msg + "📧 A confirmation email will be sent shortly. Kindly check in spam folder too.")
+
+    elif message.lower() in ["no", "n"]:
+        # the appointment was never touched; dropping the hold frees the new slot
+        release_hold(state.hold_id)
+        log.info("Reschedule of %s abandoned", appointment.serial_number)
+        return finish("Rescheduling cancelled. The original appointment remains unchanged.")
+    return reply("❌ Please reply with 'confirm' or 'no'. Type 'restart' if needed.")
@@ -0,0 +1,241 @@
+# asgi.py
+# ASGI entry point, e.g. `uvicorn asgi:application --workers 4`.
+# /chat and /chat/stream are served natively: health answers are awaited from the LLM
+# scheduler (streams from the async LLM client), so thousands of turns can wait on the
+# upstream without holding a thread.
+# Command routing and the booking flows (short local DB work) run on a bounded
+# thread pool; every other path is bridged to the regular Flask app.
+import asyncio
+import io
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from app import (app, email_worker, hold_sweeper, handle_message, start_services, chat_rate_wait, turn_gate,
+                 DeferredHealthAnswer, RATE_LIMITED_TEXT)
+from appUtils import aget_llm_response, astream_llm_response
+from llmScheduler import stop_llm_scheduler
+from dbBootstrap import is_ready
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("ASGI_WORKER_THREADS", "16")),
+                               thread_name_prefix="asgi-turn")
+
+
+def _route_turn(user_id, user_message):
+    metrics.reset_query_count()
+    with app.app_context():
+        result = handle_message(user_id, user_message, DeferredHealthAnswer)
+        labels = metrics.turn_labels()
+        if not isinstance(result, DeferredHealthAnswer):
+            result = result.get_json()["response"]
+    return result, labels, metrics.query_count()
+
+
+def _run_turn(user_id, user_message, client_ip):
+    """Route one turn; returns (reply text or DeferredHealthAnswer, metric labels, query count), or the
+    seconds to wait when the client is over its rate limit."""
+    if not is_ready(app):
+        start_services()
+    wait = chat_rate_wait(user_id, client_ip)
+    if wait:
+        return wait
+    # serialized per user; an identical in-flight message shares this result
+    return turn_gate.run(user_id, user_message, lambda: _route_turn(user_id, user_message))
+
+
+def _sse_event(payload):
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode()
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, status, payload, headers=()):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                            *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _rate_limited(send, wait, stream):
+    text = RATE_LIMITED_TEXT.format(seconds=math.ceil(wait))
+    retry_after = (b"retry-after", str(math.ceil(wait)).encode())
+    if not stream:
+        await _send_json(send, 429, {"response": text}, [retry_after])
+        return
+    await send({"type": "http.response.start", "status": 429, "headers": [
+        (b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"), retry_after]})
+    await send({"type": "http.response.body", "body": _sse_event({"type": "message", "text": text}) +
+                _sse_event({"type": "done"})})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _chat(scope, body, receive, send, stream):
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        await _send_json(send, 400, {"error": "invalid JSON"})
+        return
+    user_id = data.get("user_id", "default")
+    user_message = (data.get("message") or "").strip()
+    started = time.perf_counter()
+    client_ip = (scope.get("client") or ("unknown",))[0]
+    turn = await asyncio.get_running_loop().run_in_executor(_executor, _run_turn, user_id, user_message, client_ip)
+    if not isinstance(turn, tuple):
+        await _rate_limited(send, turn, stream)
+        return
+    result, labels, queries = turn
+    try:
+        await _respond(result, receive, send, stream)
+    finally:
+        if labels and app.config['METRICS_ENABLED']:
+            metrics.observe_turn(labels, time.perf_counter() - started, queries)
+
+
+async def _respond(result, receive, send, stream):
+    if not stream:
+        if isinstance(result, DeferredHealthAnswer):
+            # a client that hangs up while its question is queued withdraws it from the LLM scheduler
+            answer = asyncio.ensure_future(aget_llm_response(result.message))
+            disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+            await asyncio.wait({answer, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            disconnected.cancel()
+            if not answer.done():
+                answer.cancel()
+                return
+            result = answer.result()
+        await _send_json(send, 200, {"response": result})
+        return
+
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream; charset=utf-8"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+    ]})
+    if isinstance(result, DeferredHealthAnswer):
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        chunks = astream_llm_response(result.message)
+        try:
+            async for chunk in chunks:
+                if disconnected.done():
+                    return
+                await send({"type": "http.response.body", "body": _sse_event({"type": "delta", "text": chunk}),
+                            "more_body": True})
+        finally:
+            await chunks.aclose()
+            disconnected.cancel()
+    else:
+        await send({"type": "http.response.body", "body": _sse_event({"type": "message", "text": result}),
+                    "more_body": True})
+    await send({"type": "http.response.body", "body": _sse_event({"type": "done"})})
+
+
+# ---------------- bridge to the Flask (WSGI) app ----------------
+
+def _wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _start_wsgi(environ):
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"], started["headers"] = status, headers
+
+    iterable = app(environ, start_response)
+    return started, iterable, iter(iterable)
+
+
+async def _wsgi_fallback(scope, body, send):
+    loop = asyncio.get_running_loop()
+    started, iterable, chunks = await loop.run_in_executor(_executor, _start_wsgi, _wsgi_environ(scope, body))
+    try:
+        # Flask calls start_response lazily for streamed bodies, so pull the first chunk first
+        first = await loop.run_in_executor(_executor, next, chunks, None)
+        await send({"type": "http.response.start", "status": int(started["status"].split()[0]),
+                    "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in started["headers"]]})
+        chunk = first
+        while chunk is not None:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await loop.run_in_executor(_executor, next, chunks, None)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(iterable, "close"):
+            await loop.run_in_executor(_executor, iterable.close)
+
+
+# ---------------- ASGI application ----------------
+
+async def _lifespan(receive, send):
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await loop.run_in_executor(None, start_services)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await loop.run_in_executor(None, email_worker.stop)
+            await loop.run_in_executor(None, hold_sweeper.stop)
+            await loop.run_in_executor(None, stop_llm_scheduler)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    body = await _read_body(receive)
+    if body is None:
+        return
+    if scope["method"] == "POST" and scope["path"] in ("/chat", "/chat/stream"):
+        await _chat(scope, body, receive, send, stream=scope["path"] == "/chat/stream")
+    else:
+        await _wsgi_fallback(scope, body, send)
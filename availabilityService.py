@@ -0,0 +1,124 @@
+# availabilityService.py
+# Doctor working hours, per-shift slot grids and free-slot lookups.
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import db, Appointment, DoctorShift, SlotHold, ACTIVE_STATUSES
+
+DEFAULT_WORKING_HOURS = {"Morning": ["09:00", "12:00"], "Evening": ["16:00", "19:00"]}
+DEFAULT_SLOT_MINUTES = 60
+
+# doctor_id -> [(shift name, start, end, [(slot start, label), ...]), ...]
+_slot_grids = {}
+_grid_lock = threading.Lock()
+
+
+def slot_label(start, end):
+    """09:00/10:00 -> "09:00-10:00 AM", 11:00/12:00 -> "11:00 AM-12:00 PM"."""
+    s, e = start.strftime("%I:%M %p"), end.strftime("%I:%M %p")
+    if s[-2:] == e[-2:]:
+        return f"{s[:-3]}-{e}"
+    return f"{s}-{e}"
+
+
+def build_shift_rows(doctor_id, working_hours=None, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """DoctorShift rows from a {"Morning": ["09:00", "12:00"], ...} mapping."""
+    rows = []
+    for name, (start, end) in (working_hours or DEFAULT_WORKING_HOURS).items():
+        rows.append(DoctorShift(
+            doctor_id=doctor_id,
+            name=name,
+            start_time=datetime.strptime(start, "%H:%M").time(),
+            end_time=datetime.strptime(end, "%H:%M").time(),
+            slot_minutes=slot_minutes,
+        ))
+    return rows
+
+
+def _build_grid(shifts):
+    grid = []
+    for shift in sorted(shifts, key=lambda s: s.start_time):
+        step = timedelta(minutes=shift.slot_minutes)
+        cursor = datetime.combine(datetime.min, shift.start_time)
+        end = datetime.combine(datetime.min, shift.end_time)
+        slots = []
+        while cursor + step <= end:
+            slots.append((cursor.time(), slot_label(cursor.time(), (cursor + step).time())))
+            cursor += step
+        grid.append((shift.name, shift.start_time, shift.end_time, slots))
+    return grid
+
+
+def slot_grid(doctor_id):
+    """Precomputed shifts and slots for a doctor; the same grid applies to every working day."""
+    grid = _slot_grids.get(doctor_id)
+    if grid is None:
+        grid = _build_grid(DoctorShift.query.filter_by(doctor_id=doctor_id).all())
+        with _grid_lock:
+            _slot_grids[doctor_id] = grid
+    return grid
+
+
+def invalidate_slot_grids():
+    with _grid_lock:
+        _slot_grids.clear()
+
+
+@event.listens_for(DoctorShift, "after_insert")
+@event.listens_for(DoctorShift, "after_update")
+@event.listens_for(DoctorShift, "after_delete")
+def _working_hours_changed(mapper, connection, target):
+    invalidate_slot_grids()
+
+
+def shift_menu(doctor_id):
+    lines = [
+        f"{i}. {name} ({start.strftime('%H:%M')} – {end.strftime('%H:%M')})"
+        for i, (name, start, end, _) in enumerate(slot_grid(doctor_id), 1)
+    ]
+    return "\n".join(lines)
+
+
+def get_shift(doctor_id, choice):
+    """Shift name and slot list for a 1-based menu choice, or None."""
+    grid = slot_grid(doctor_id)
+    if not choice.isdigit() or not 1 <= int(choice) <= len(grid):
+        return None
+    name, _, _, slots = grid[int(choice) - 1]
+    return name, slots
+
+
+def booked_times(doctor_id, day, exclude_id=None):
+    """Start times on `day` taken by active appointments or unexpired holds (one indexed query)."""
+    day_start = datetime.combine(day, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+    query = db.session.query(Appointment.appointment_time).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.appointment_time >= day_start,
+        Appointment.appointment_time < day_end,
+        Appointment.status.in_(ACTIVE_STATUSES),
+    )
+    if exclude_id is not None:
+        query = query.filter(Appointment.id != exclude_id)
+    held = db.session.query(SlotHold.slot_time).filter(
+        SlotHold.doctor_id == doctor_id,
+        SlotHold.slot_time >= day_start,
+        SlotHold.slot_time < day_end,
+        SlotHold.expires_at > datetime.utcnow(),
+    )
+    return {t.time() for (t,) in query.union_all(held)}
+
+
+def free_slots(doctor_id, day, slots, exclude_id=None):
+    """Filter a shift's slots down to the ones still open on `day`.
+
+    Returns a list of (label, start time) pairs. Slots that have already started today are skipped.
+    """
+    taken = booked_times(doctor_id, day, exclude_id)
+    now = datetime.now()
+    return [
+        (label, start)
+        for start, label in slots
+        if start not in taken and datetime.combine(day, start) > now
+    ]
+
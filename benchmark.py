@@ -0,0 +1,381 @@
+# benchmark.py
+# Load and latency benchmark for the /chat conversation flows.
+#
+#   python benchmark.py --concurrency 8 --iterations 50 --output bench.json
+#   python benchmark.py --mode http --llm-latency 0.8 --scenarios booking health
+#
+# Each virtual user plays a scripted conversation against a throwaway SQLite database.
+# The LLM and the email provider are replaced by local fakes with configurable latency
+# (mockServers.py); --email sendgrid drives the real SendGrid client against a local sink.
+# The report gives throughput, p50/p95/p99 latency per (scenario, stage) and DB
+# queries per turn, and the JSON result file can be diffed between versions.
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from mockServers import start_mock_llm, start_sendgrid_sink
+
+BOOKING_DAYS_AHEAD = 1
+
+
+# ---------------- fakes ----------------
+
+class FakeEmailTransport:
+    """Stands in for SendGrid/SMTP: every send just takes `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def open(self):
+        pass
+
+    def send(self, to_email, subject, body):
+        time.sleep(self.latency)
+        with self._lock:
+            self.sent += 1
+
+    def close(self):
+        pass
+
+
+# ---------------- scenarios ----------------
+# A scenario is setup (untimed turns) plus timed (stage, message) steps. Messages may be
+# callables taking the per-conversation context, e.g. to use a serial number from setup.
+
+def _booking_steps(ctx):
+    return [
+        ("start", "book appointment"),
+        ("name", "Bench User"),
+        ("email", f"bench{ctx['n']}@example.com"),
+        ("mobile", ctx["mobile"]),
+        ("speciality", "fever and cough since yesterday"),
+        ("choose_doctor", "1"),
+        ("date", ctx["day"]),
+        ("time", "1"),
+        ("slot_choice", "1"),
+        ("confirmation", "confirm"),
+    ]
+
+
+SCENARIOS = {
+    "booking": {
+        "setup": False,
+        "steps": _booking_steps,
+        "expect": "Appointment Confirmed",
+    },
+    "cancel_mobile": {
+        "setup": True,
+        "steps": lambda ctx: [("start", "cancel"), ("choose_method", "1"),
+                              ("awaiting_mobile", ctx["mobile"]), ("confirm_cancel", "yes")],
+        "expect": "successfully cancelled",
+    },
+    "cancel_serial": {
+        "setup": True,
+        "steps": lambda ctx: [("start", "cancel"), ("choose_method", "2"),
+                              ("awaiting_serial", ctx["serial"]), ("confirm_cancel", "yes")],
+        "expect": "successfully cancelled",
+    },
+    "reschedule": {
+        "setup": True,
+        "steps": lambda ctx: [("start", "reschedule"), ("choose_method", "2"),
+                              ("awaiting_serial", ctx["serial"]), ("confirm_reschedule", "yes"),
+                              ("date", ctx["day"]), ("time", "2"), ("slot_choice", "1"),
+                              ("confirmation", "confirm")],
+        "expect": "Appointment Rescheduled",
+    },
+    "health": {
+        "setup": False,
+        "steps": lambda ctx: [("health_query", f"I have had a stiff neck and dry eyes for {ctx['n'] % 7 + 1} days")],
+        "expect": "",
+    },
+    # answered by the offline triage, no LLM call
+    "triage": {
+        "setup": False,
+        "steps": lambda ctx: [("triage_query", f"I have a fever and headache since {ctx['n'] % 7 + 1} days")],
+        "expect": "General Physician",
+    },
+}
+
+
+# ---------------- clients ----------------
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, user_id, message):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post("/chat", json={"user_id": user_id, "message": message})
+        queries = response.headers.get("X-Bench-Queries")
+        return response.get_json()["response"], int(queries) if queries is not None else None
+
+
+class HTTPDriver:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self._local = threading.local()
+
+    def post(self, user_id, message):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        body = json.dumps({"user_id": user_id, "message": message})
+        try:
+            conn.request("POST", "/chat", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            # server closed the keep-alive connection; retry once on a fresh one
+            conn.close()
+            conn.request("POST", "/chat", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+        payload = json.loads(response.read())
+        queries = response.getheader("X-Bench-Queries")
+        return payload["response"], int(queries) if queries is not None else None
+
+
+def install_query_counter(app):
+    """Report metrics.query_count() for each request in an X-Bench-Queries header."""
+    import metrics
+
+    @app.after_request
+    def _report_counter(response):
+        response.headers["X-Bench-Queries"] = str(metrics.query_count())
+        return response
+
+
+# ---------------- runner ----------------
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # nearest-rank
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}  # "scenario.stage" -> [seconds]
+        self.queries = {}  # "scenario.stage" -> [count]
+        self.conversations = {}  # scenario -> completed count
+        self.errors = {}  # scenario -> failed count
+        self._lock = threading.Lock()
+
+    def turn(self, key, seconds, queries):
+        with self._lock:
+            self.latencies.setdefault(key, []).append(seconds)
+            if queries is not None:
+                self.queries.setdefault(key, []).append(queries)
+
+    def outcome(self, scenario, ok):
+        with self._lock:
+            bucket = self.conversations if ok else self.errors
+            bucket[scenario] = bucket.get(scenario, 0) + 1
+
+
+def run_conversation(driver, recorder, scenario_name, n):
+    scenario = SCENARIOS[scenario_name]
+    ctx = {
+        "n": n,
+        "user": f"bench-{scenario_name}-{n}",
+        "mobile": f"9{n:09d}",
+        # one day per conversation keeps every scripted slot free
+        "day": (date.today() + timedelta(days=BOOKING_DAYS_AHEAD + n)).isoformat(),
+    }
+    try:
+        if scenario["setup"]:
+            reply = ""
+            for _, message in _booking_steps(ctx):
+                reply, _ = driver.post(ctx["user"] + "-setup", message)
+            ctx["serial"] = reply.split("Serial Number: ")[1].split("\n")[0].strip()
+        reply = ""
+        for stage, message in scenario["steps"](ctx):
+            started = time.perf_counter()
+            reply, queries = driver.post(ctx["user"], message)
+            recorder.turn(f"{scenario_name}.{stage}", time.perf_counter() - started, queries)
+        recorder.outcome(scenario_name, scenario["expect"] in reply)
+    except Exception as e:
+        print(f"[benchmark] {scenario_name} #{n} failed: {e}", file=sys.stderr)
+        recorder.outcome(scenario_name, False)
+
+
+def summarize(recorder, wall_seconds):
+    stages = {}
+    for key, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        queries = recorder.queries.get(key, [])
+        stages[key] = {
+            "turns": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+            "queries_mean": round(sum(queries) / len(queries), 2) if queries else None,
+            "queries_max": max(queries) if queries else None,
+        }
+    turns = sum(len(v) for v in recorder.latencies.values())
+    conversations = sum(recorder.conversations.values())
+    return {
+        "wall_seconds": round(wall_seconds, 3),
+        "turns": turns,
+        "turns_per_second": round(turns / wall_seconds, 2) if wall_seconds else None,
+        "conversations": conversations,
+        "conversations_per_second": round(conversations / wall_seconds, 2) if wall_seconds else None,
+        "completed": recorder.conversations,
+        "errors": recorder.errors,
+        "stages": stages,
+    }
+
+
+def print_report(summary):
+    print(f"\n{summary['turns']} turns in {summary['wall_seconds']}s "
+          f"({summary['turns_per_second']} turns/s, {summary['conversations_per_second']} conversations/s)")
+    print(f"completed: {summary['completed']}  errors: {summary['errors']}\n")
+    print(f"{'stage':38} {'turns':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+    for key, row in summary["stages"].items():
+        queries = "-" if row["queries_mean"] is None else row["queries_mean"]
+        print(f"{key:38} {row['turns']:>6} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {queries:>8}")
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the /chat conversation flows.")
+    parser.add_argument("--mode", choices=["client", "http"], default="client",
+                        help="drive app.test_client() in-process, or real HTTP (default: client)")
+    parser.add_argument("--url", help="benchmark an already running server over HTTP, e.g. http://127.0.0.1:8000 "
+                             "(the fakes and query counts then only apply if that server set them up)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=20, help="conversations per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds the fake LLM takes per answer")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0,
+                        help="fake LLM token throughput; 0 answers all at once")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of fake LLM calls that fail, 0-1")
+    parser.add_argument("--email", choices=["fake", "sendgrid"], default="fake",
+                        help="'sendgrid' sends through the real SendGrid client to a local sink")
+    parser.add_argument("--email-latency", type=float, default=0.05, help="seconds the fake email provider takes per send")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache enabled")
+    parser.add_argument("--session-backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--output", help="write the JSON result here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="healthbot-bench-")
+    llm = start_mock_llm(args.llm_latency, args.llm_tokens_per_second, args.llm_error_rate, seed=0)
+    sink = start_sendgrid_sink(args.email_latency, seed=0) if args.email == "sendgrid" else None
+
+    # configuration is read when app.py is imported, so set it up first
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+    os.environ["LLM_BASE_URL"] = llm.url + "/v1"
+    if sink is not None:
+        os.environ["EMAIL_TRANSPORT"] = "sendgrid"
+        os.environ["SENDGRID_HOST"] = sink.url
+        os.environ.setdefault("SENDGRID_API_KEY", "bench")
+        os.environ["EMAIL_FROM"] = "bench@example.com"
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ["LLM_CACHE_ENABLED"] = "1" if args.llm_cache else "0"
+    os.environ["LLM_MAX_CONCURRENCY"] = str(max(8, args.concurrency))
+    os.environ["LLM_QUEUE_TIMEOUT"] = "30"
+    os.environ["LLM_DEADLINE"] = "30"
+    # every virtual user comes from one address, which the per-IP bucket would throttle
+    os.environ["RATE_LIMIT_BACKEND"] = "off"
+    os.environ["SESSION_BACKEND"] = args.session_backend
+    os.environ["SESSION_SQLITE_PATH"] = os.path.join(workdir, "sessions.db")
+    # metrics.init_app counts the SQL statements per request that X-Bench-Queries reports
+    os.environ["METRICS_ENABLED"] = "1"
+    import app as chat_app
+    from llmScheduler import stop_llm_scheduler
+
+    transport = None
+    if sink is None:
+        transport = FakeEmailTransport(args.email_latency)
+        chat_app.email_worker.transport_factory = lambda app: transport
+    chat_app.start_services()
+    install_query_counter(chat_app.app)
+
+    server = None
+    if args.mode == "client" and not args.url:
+        driver = TestClientDriver(chat_app.app)
+    elif args.url:
+        host, _, port = args.url.split("//", 1)[-1].rstrip("/").partition(":")
+        driver = HTTPDriver(host, int(port or 80))
+    else:
+        from werkzeug.serving import WSGIRequestHandler, make_server
+        quiet = type("QuietHandler", (WSGIRequestHandler,), {"log_request": lambda self, *args: None})
+        server = make_server("127.0.0.1", 0, chat_app.app, threaded=True, request_handler=quiet)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        driver = HTTPDriver("127.0.0.1", server.server_port)
+
+    recorder = Recorder()
+    jobs = [(name, n) for n in range(args.iterations) for name in args.scenarios]
+    # distinct conversation numbers per scenario so users, mobiles and days never collide
+    offsets = {name: i * args.iterations for i, name in enumerate(args.scenarios)}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for name, n in jobs:
+            pool.submit(run_conversation, driver, recorder, name, offsets[name] + n)
+    summary = summarize(recorder, time.perf_counter() - started)
+
+    if server is not None:
+        server.shutdown()
+    chat_app.email_worker.stop()
+    if not args.url:
+        # the worker polls every few seconds, so send whatever is still due before counting
+        while chat_app.email_worker.drain_once(transport):
+            pass
+        summary["emails_sent"] = transport.sent if transport else sink.requests - sink.failures
+    chat_app.hold_sweeper.stop()
+    stop_llm_scheduler()
+    llm.shutdown()
+    if sink is not None:
+        sink.shutdown()
+
+    result = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "mode": "http" if args.url else args.mode,
+            "concurrency": args.concurrency,
+            "iterations": args.iterations,
+            "scenarios": args.scenarios,
+            "llm_latency": args.llm_latency,
+            "email_latency": args.email_latency,
+            "llm_cache": args.llm_cache,
+            "session_backend": args.session_backend,
+        },
+        **summary,
+    }
+    print_report(summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2, sort_keys=True)
+        print(f"\nResults written to {args.output}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
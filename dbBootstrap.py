@@ -0,0 +1,78 @@
+# dbBootstrap.py
+# One-time database initialisation: schema, migrations and seed data.
+# Runs at startup (or via `flask init-db`) so the request path never issues DDL.
+import json
+import os
+import threading
+from sqlalchemy import inspect
+from models import db, Doctor, DoctorShift
+from availabilityService import build_shift_rows, DEFAULT_SLOT_MINUTES
+from doctorCache import ensure_roster_version, load_catalog
+import migrations
+
+DOCTORS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "doctors.json")
+
+_bootstrap_lock = threading.Lock()
+
+
+def is_ready(app):
+    return app.extensions.get("healthbot_db_ready", False)
+
+
+def load_doctor_roster(path=DOCTORS_FILE):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def seed_doctors(path=DOCTORS_FILE):
+    """Insert the doctor roster from the data file when the table is empty."""
+    if db.session.query(Doctor.id).first():
+        return 0
+    roster = load_doctor_roster(path)
+    db.session.add_all([
+        Doctor(name=d["name"], speciality=d["speciality"], consultation_fee=d["consultation_fee"])
+        for d in roster
+    ])
+    db.session.commit()
+    return len(roster)
+
+
+def seed_doctor_shifts(path=DOCTORS_FILE):
+    """Give every doctor without working hours the hours from the roster file (or the defaults)."""
+    with_shifts = {doctor_id for (doctor_id,) in db.session.query(DoctorShift.doctor_id).distinct()}
+    missing = [d for d in Doctor.query.all() if d.id not in with_shifts]
+    if not missing:
+        return 0
+    roster = {d["name"]: d for d in load_doctor_roster(path)}
+    for doctor in missing:
+        entry = roster.get(doctor.name, {})
+        db.session.add_all(build_shift_rows(
+            doctor.id, entry.get("working_hours"), entry.get("slot_minutes", DEFAULT_SLOT_MINUTES)
+        ))
+    db.session.commit()
+    return len(missing)
+
+
+def bootstrap_database(app):
+    """Create the schema, apply pending migrations and seed doctors exactly once per process."""
+    if is_ready(app):
+        return
+    with _bootstrap_lock:
+        if is_ready(app):
+            return
+        with app.app_context():
+            fresh = not inspect(db.engine).has_table("doctor")
+            db.create_all()
+            with db.engine.begin() as conn:
+                migrations.ensure_version_table(conn)
+                if fresh:
+                    migrations.stamp_head(conn)
+                else:
+                    migrations.apply_pending(conn, app.logger)
+                ensure_roster_version(conn)
+            seeded = seed_doctors()
+            if seeded:
+                app.logger.info("Seeded %s doctors from %s", seeded, DOCTORS_FILE)
+            seed_doctor_shifts()
+            load_catalog()
+        app.extensions["healthbot_db_ready"] = True
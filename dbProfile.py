@@ -0,0 +1,68 @@
+# dbProfile.py
+# Engine tuning for the configured DATABASE_URL. File-backed SQLite gets WAL journaling,
+# synchronous=NORMAL, a busy timeout and memory-mapped reads on every new connection, so
+# readers never block the writer and concurrent confirmations wait for the lock instead
+# of failing with "database is locked". PostgreSQL gets a pre-pinged, recycled pool.
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+DEFAULT_MMAP_BYTES = 256 * 1024 * 1024
+
+
+def normalize_uri(uri):
+    """Accept Heroku-style postgres:// URLs, which SQLAlchemy 2 rejects."""
+    if uri.startswith("postgres://"):
+        return "postgresql://" + uri[len("postgres://"):]
+    return uri
+
+
+def _is_memory(url):
+    return url.database in (None, "", ":memory:")
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database."""
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite" and _is_memory(url):
+        return {}  # single shared connection; pool settings do not apply
+    options = {
+        "pool_size": config.get("DB_POOL_SIZE", 10),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 20),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 10),
+    }
+    if url.get_backend_name() == "sqlite":
+        # sqlite3's own wait for a locked database, in seconds
+        options["connect_args"] = {"timeout": config.get("DB_BUSY_TIMEOUT_MS", 5000) / 1000}
+    else:
+        options["pool_recycle"] = config.get("DB_POOL_RECYCLE", 1800)
+        options["pool_pre_ping"] = True
+    return options
+
+
+def sqlite_pragmas(config, memory=False):
+    pragmas = {
+        "synchronous": config.get("DB_SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": config.get("DB_BUSY_TIMEOUT_MS", 5000),
+    }
+    if not memory:
+        # WAL and mmap only mean something for a database file
+        pragmas["journal_mode"] = config.get("DB_SQLITE_JOURNAL_MODE", "WAL")
+        pragmas["mmap_size"] = config.get("DB_SQLITE_MMAP_BYTES", DEFAULT_MMAP_BYTES)
+    return pragmas
+
+
+def init_app(app, db):
+    """Apply the per-connection settings for the configured backend to the app's engine."""
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite":
+        return
+    pragmas = sqlite_pragmas(app.config, _is_memory(url))
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
@@ -0,0 +1,130 @@
+# doctorCache.py
+# Per-process doctor catalog: every doctor indexed by id and by speciality, plus the
+# speciality and doctor menus pre-rendered as text. The roster is tiny and rarely
+# changes, so the catalog is loaded once and rebuilt only when the roster version in
+# the roster_version table moved on. Every transaction that inserts, updates or deletes
+# a doctor bumps that version, so changes made by another worker or by `flask
+# import-doctors` show up within DOCTOR_CATALOG_CHECK_SECONDS.
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import event, select, text, update
+from sqlalchemy.orm import Session, object_session
+from models import db, Doctor, RosterVersion
+
+# immutable snapshot, safe to share between requests and threads
+DoctorInfo = namedtuple("DoctorInfo", ["id", "name", "speciality", "consultation_fee"])
+
+Catalog = namedtuple("Catalog", [
+    "version",
+    "doctors",          # id -> DoctorInfo
+    "specialities",     # in roster order; menu number n is specialities[n - 1]
+    "by_speciality",    # speciality -> (DoctorInfo, ...)
+    "speciality_menu",  # "1. General Physician\n2. ..."
+    "speciality_help",  # "1 → General Physician\n2 → ..."
+    "doctor_menus",     # speciality -> "1. Dr. A (Speciality)\n2. ..."
+])
+
+_catalog = None
+_next_check = 0.0  # monotonic time of the next roster version check
+_lock = threading.Lock()
+
+
+def _snapshot(doctor):
+    return DoctorInfo(doctor.id, doctor.name, doctor.speciality, doctor.consultation_fee)
+
+
+def _build(version):
+    doctors = {d.id: _snapshot(d) for d in Doctor.query.order_by(Doctor.id)}
+    grouped = {}
+    for info in doctors.values():
+        grouped.setdefault(info.speciality, []).append(info)
+    specialities = tuple(grouped)
+    return Catalog(
+        version=version,
+        doctors=doctors,
+        specialities=specialities,
+        by_speciality={s: tuple(d) for s, d in grouped.items()},
+        speciality_menu="\n".join(f"{i}. {s}" for i, s in enumerate(specialities, 1)),
+        speciality_help="\n".join(f"{i} → {s}" for i, s in enumerate(specialities, 1)),
+        doctor_menus={
+            s: "\n".join(f"{i}. {d.name} ({d.speciality})" for i, d in enumerate(group, 1))
+            for s, group in grouped.items()
+        },
+    )
+
+
+def ensure_roster_version(conn):
+    """Create the single roster_version row if it is missing (run at bootstrap)."""
+    conn.execute(text(
+        "INSERT INTO roster_version (id, version) SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM roster_version)"
+    ))
+
+
+def roster_version():
+    return db.session.scalar(select(RosterVersion.version)) or 0
+
+
+def get_catalog():
+    """The current catalog; the shared roster version is checked at most every DOCTOR_CATALOG_CHECK_SECONDS."""
+    global _next_check
+    catalog = _catalog
+    now = time.monotonic()
+    if catalog is not None and now < _next_check:
+        return catalog
+    _next_check = now + current_app.config.get("DOCTOR_CATALOG_CHECK_SECONDS", 5)
+    version = roster_version()
+    if catalog is None or catalog.version != version:
+        catalog = load_catalog(version)
+    return catalog
+
+
+def load_catalog(version=None):
+    global _catalog
+    with _lock:
+        # read the version first: a change committed mid-build only costs one more rebuild
+        _catalog = _build(roster_version() if version is None else version)
+        return _catalog
+
+
+def bump_catalog_version(session, connection=None):
+    """Advance the shared roster version inside the session's transaction, once per transaction."""
+    if not session.info.get("doctor_roster_changed"):
+        (connection or session.connection()).execute(update(RosterVersion).values(version=RosterVersion.version + 1))
+        session.info["doctor_roster_changed"] = True
+
+
+def get_doctor(doctor_id):
+    """Doctor snapshot for an id, or None."""
+    return get_catalog().doctors.get(doctor_id)
+
+
+def speciality_for_choice(choice, catalog=None):
+    """Speciality for a 1-based menu number, or None."""
+    specialities = (catalog or get_catalog()).specialities
+    if not choice.strip().isdigit() or not 1 <= int(choice) <= len(specialities):
+        return None
+    return specialities[int(choice) - 1]
+
+
+# bump in the same transaction as the change, so it is seen exactly when the change is
+@event.listens_for(Doctor, "after_insert")
+@event.listens_for(Doctor, "after_update")
+@event.listens_for(Doctor, "after_delete")
+def _roster_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        bump_catalog_version(session, connection)
+
+
+@event.listens_for(Session, "after_commit")
+def _roster_committed(session):
+    global _next_check
+    if session.info.pop("doctor_roster_changed", False):
+        _next_check = 0.0  # this process rebuilds on its next lookup
+
+
+@event.listens_for(Session, "after_rollback")
+def _roster_rolled_back(session):
+    session.info.pop("doctor_roster_changed", None)
@@ -0,0 +1,231 @@
+# emailOutbox.py
+# Durable email outbox. Chat flows enqueue rows in their own transaction and a
+# background worker pool delivers them, so a chat turn never waits on SMTP/HTTP.
+import json
+import os
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from sqlalchemy import func, update
+from models import db, EmailOutbox
+
+
+def enqueue_email(to_email, subject, body):
+    """Add an email to the outbox. The caller's commit makes it visible to the worker."""
+    message = EmailOutbox(to_email=to_email, subject=subject, body=body)
+    db.session.add(message)
+    return message
+
+
+def queue_depth():
+    return db.session.query(func.count(EmailOutbox.id)).filter(
+        EmailOutbox.status.in_(("queued", "sending"))
+    ).scalar()
+
+
+# ---------------- transports ----------------
+# A transport sends one message and raises on failure. open()/close() bracket a batch
+# so connection-oriented transports can reuse one connection for the whole batch.
+
+class EmailTransport:
+    def open(self):
+        pass
+
+    def send(self, to_email, subject, body):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SendGridTransport(EmailTransport):
+    def __init__(self, api_key, from_email, host=None):
+        # imported lazily so file/SMTP setups don't need the sendgrid package
+        from sendgrid import SendGridAPIClient
+        # host points at another SendGrid-compatible endpoint, e.g. the sink in mockServers.py
+        self.client = SendGridAPIClient(api_key, host=host) if host else SendGridAPIClient(api_key)
+        self.from_email = from_email
+
+    def send(self, to_email, subject, body):
+        from sendgrid.helpers.mail import Mail
+        message = Mail(from_email=self.from_email, to_emails=to_email, subject=subject, plain_text_content=body)
+        response = self.client.send(message)
+        if response.status_code >= 300:
+            raise RuntimeError(f"SendGrid returned {response.status_code}")
+
+
+class SMTPTransport(EmailTransport):
+    def __init__(self, host, port, from_email, username=None, password=None, use_tls=True):
+        self.host, self.port = host, port
+        self.from_email = from_email
+        self.username, self.password = username, password
+        self.use_tls = use_tls
+        self._conn = None
+
+    def open(self):
+        self._conn = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.use_tls:
+            self._conn.starttls()
+        if self.username:
+            self._conn.login(self.username, self.password)
+
+    def send(self, to_email, subject, body):
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = self.from_email, to_email, subject
+        message.set_content(body)
+        self._conn.send_message(message)
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except smtplib.SMTPException:
+                pass
+            self._conn = None
+
+
+class FileTransport(EmailTransport):
+    """Appends each message as a JSON line; a local sink for development and tests."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, to_email, subject, body):
+        record = {"to": to_email, "subject": subject, "body": body, "sent_at": datetime.utcnow().isoformat()}
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def create_transport(app):
+    kind = app.config.get("EMAIL_TRANSPORT", "sendgrid")
+    from_email = app.config.get("EMAIL_FROM")
+    if kind == "sendgrid":
+        return SendGridTransport(app.config.get("SENDGRID_API_KEY"), from_email, app.config.get("SENDGRID_HOST"))
+    if kind == "smtp":
+        return SMTPTransport(
+            app.config.get("SMTP_HOST", "localhost"), int(app.config.get("SMTP_PORT", 587)), from_email,
+            app.config.get("SMTP_USERNAME"), app.config.get("SMTP_PASSWORD"),
+            use_tls=app.config.get("SMTP_USE_TLS", True),
+        )
+    if kind == "file":
+        path = app.config.get("EMAIL_FILE_PATH") or os.path.join(app.instance_path, "sent_emails.jsonl")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return FileTransport(path)
+    raise ValueError(f"Unknown EMAIL_TRANSPORT: {kind}")
+
+
+# ---------------- worker ----------------
+
+class OutboxWorker:
+    """Threads that claim due outbox rows in batches and deliver them.
+
+    A claimed row gets next_attempt_at pushed out by `lease` seconds, so rows held by
+    a crashed worker become due again. Failures retry with exponential backoff until
+    `max_attempts`, after which the row is marked failed.
+    """
+
+    def __init__(self, app, transport_factory, threads=2, batch_size=20, poll_interval=2.0,
+                 max_attempts=5, backoff_base=30, lease=300):
+        self.app = app
+        # each thread builds its own transport so connections are never shared
+        self.transport_factory = transport_factory
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.lease = lease
+        self._stop = threading.Event()
+        self._workers = []
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._workers:
+                return
+            for i in range(self.threads):
+                worker = threading.Thread(target=self._run, name=f"email-outbox-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _run(self):
+        with self.app.app_context():
+            transport = self.transport_factory(self.app)
+        while not self._stop.is_set():
+            try:
+                sent = self.drain_once(transport)
+            except Exception:
+                self.app.logger.exception("Email outbox worker failed")
+                sent = 0
+            if not sent:
+                self._stop.wait(self.poll_interval)
+
+    def _claim(self):
+        now = datetime.utcnow()
+        due = db.session.query(EmailOutbox.id).filter(
+            EmailOutbox.status.in_(("queued", "sending")),
+            EmailOutbox.next_attempt_at <= now,
+        ).order_by(EmailOutbox.next_attempt_at).limit(self.batch_size).all()
+        claimed = []
+        for (message_id,) in due:
+            # compare-and-set so two workers (or processes) never claim the same row
+            result = db.session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == message_id,
+                       EmailOutbox.status.in_(("queued", "sending")),
+                       EmailOutbox.next_attempt_at <= now)
+                .values(status="sending", attempts=EmailOutbox.attempts + 1,
+                        next_attempt_at=now + timedelta(seconds=self.lease))
+            )
+            if result.rowcount:
+                claimed.append(message_id)
+        db.session.commit()
+        if not claimed:
+            return []
+        return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).all()
+
+    def drain_once(self, transport=None):
+        """Deliver one batch of due messages; returns how many were sent."""
+        with self.app.app_context():
+            transport = transport or self.transport_factory(self.app)
+            batch = self._claim()
+            if not batch:
+                return 0
+            sent = 0
+            try:
+                transport.open()
+                for message in batch:
+                    try:
+                        transport.send(message.to_email, message.subject, message.body)
+                    except Exception as e:
+                        self._failed(message, e)
+                    else:
+                        message.status = "sent"
+                        message.sent_at = datetime.utcnow()
+                        message.last_error = None
+                        sent += 1
+            except Exception as e:
+                # could not open a connection: retry the whole batch later
+                for message in batch:
+                    if message.status == "sending":
+                        self._failed(message, e)
+            finally:
+                transport.close()
+            db.session.commit()
+            return sent
+
+    def _failed(self, message, error):
+        message.last_error = str(error)[:500]
+        if message.attempts >= self.max_attempts:
+            message.status = "failed"
+            self.app.logger.error("Giving up on email %s after %s attempts: %s", message.id, message.attempts, error)
+        else:
+            message.status = "queued"
+            message.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.backoff_base * 2 ** (message.attempts - 1))
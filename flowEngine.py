@@ -0,0 +1,83 @@
+# flowEngine.py
+# Conversation flows as transition tables. Each (flow, stage) pair maps to one step
+# handler; a handler updates the session state and returns a Reply naming the next
+# stage, so dispatch is a single dict lookup per turn.
+import logging
+from collections import namedtuple
+from flask import jsonify
+from sessionStore import SessionState, SessionTooLarge
+
+Flow = namedtuple("Flow", ["name", "start", "intro", "error"])
+Reply = namedtuple("Reply", ["text", "stage", "end"])
+
+log = logging.getLogger("healthbot.flows")
+
+
+def reply(text, stage=None):
+    """Answer the user and move to `stage` (or stay on the current one)."""
+    return Reply(text, stage, False)
+
+
+def finish(text):
+    """Answer the user and end the flow, dropping its session."""
+    return Reply(text, None, True)
+
+
+class FlowEngine:
+    def __init__(self, on_error=None):
+        self._flows = {}
+        self._steps = {}  # (flow, stage) -> handler(state, message) -> Reply
+        self._free_text = set()  # (flow, stage) pairs whose answer is a free-text description
+        # called when a step raises, e.g. to roll back the DB session
+        self.on_error = on_error
+
+    def flow(self, name, start, intro, error):
+        self._flows[name] = Flow(name, start, intro, error)
+
+    def step(self, stage, *flows, free_text=False):
+        """Register the decorated handler for `stage` in each of `flows`.
+
+        A `free_text` stage takes the user's own words (e.g. symptoms), so messages that
+        merely mention a health keyword are answers to it, not health questions.
+        """
+        def register(handler):
+            for flow in flows:
+                self._steps[(flow, stage)] = handler
+                if free_text:
+                    self._free_text.add((flow, stage))
+            return handler
+        return register
+
+    def start(self, sessions, user_id, name):
+        flow = self._flows[name]
+        sessions.save(user_id, SessionState(flow=name, stage=flow.start))
+        return jsonify({"response": flow.intro})
+
+    def handles(self, state):
+        return (state.flow, state.stage) in self._steps
+
+    def takes_free_text(self, state):
+        return (state.flow, state.stage) in self._free_text
+
+    def dispatch(self, sessions, user_id, state, message):
+        """Run the step for the user's current stage and persist the resulting state."""
+        flow = self._flows[state.flow]
+        try:
+            result = self._steps[(flow.name, state.stage)](state, message)
+            if result.end:
+                sessions.delete(user_id)
+            else:
+                if result.stage:
+                    state.stage = result.stage
+                sessions.save(user_id, state)
+        except SessionTooLarge as e:
+            log.warning("Session dropped: %s", e, extra={"flow": flow.name, "stage": state.stage})
+            sessions.delete(user_id)
+            return jsonify({"response": flow.error})
+        except Exception as e:
+            log.exception("Flow step failed", extra={"flow": flow.name, "stage": state.stage})
+            if self.on_error:
+                self.on_error()
+            sessions.delete(user_id)
+            return jsonify({"response": flow.error})
+        return jsonify({"response": result.text})
@@ -0,0 +1,92 @@
+# intentRouter.py
+# Classifies a chat message in one pass: the message is normalized once, exact
+# commands are a dict lookup, and every registered keyword is matched by a single
+# precompiled word-boundary regex that reports the intent and the words it hit.
+import re
+from collections import namedtuple
+
+IntentMatch = namedtuple("IntentMatch", ["intent", "keywords"])
+
+# generic cue words ("I have ...", "I feel ...") plus symptom words; see symptom_keywords()
+HEALTH_CUES = ("need", "have", "think", "feel", "got")
+HEALTH_SYMPTOMS = ("medicine", "cut", "fever", "cough", "pain", "headache", "sore", "throat", "cold",
+                   "flu", "sick", "ill", "bleeding", "blood", "clot")
+
+# minimal emergency words, for when the triage knowledge base is off or matched nothing
+EMERGENCY_KEYWORDS = ("bleeding", "blood clot", "clot", "vomiting blood", "coughing blood", "chest pain",
+                      "heart attack", "stroke", "unconscious", "fainted", "seizure", "cant breathe",
+                      "cannot breathe", "unable to breathe", "not breathing", "choking", "immediate")
+
+_SPACES_RE = re.compile(r"\s+")
+_EMERGENCY_RE = re.compile(r"\b(%s)(?:s|es|ing|ed)?\b" % "|".join(
+    r"\s+".join(map(re.escape, k.split())) for k in sorted(EMERGENCY_KEYWORDS, key=len, reverse=True)))
+
+
+def normalize_message(message):
+    """Lowercase, collapse whitespace and drop trailing punctuation: " Book  Appointment! " -> "book appointment"."""
+    return _SPACES_RE.sub(" ", message.lower()).strip().rstrip(".!?")
+
+
+class IntentRouter:
+    """Registry of intents, each matched by exact commands and/or keywords.
+
+    When several keyword intents match, the highest `priority` wins (registration
+    order breaks ties). The combined regex is rebuilt lazily after a registration.
+    """
+
+    def __init__(self):
+        self._commands = {}  # normalized phrase -> intent
+        self._keywords = {}  # normalized keyword -> intent
+        self._priority = {}  # intent -> (priority, registration order)
+        self._pattern = None
+
+    def register(self, intent, commands=(), keywords=(), priority=0):
+        self._priority.setdefault(intent, (priority, -len(self._priority)))
+        for phrase in commands:
+            self._commands[normalize_message(phrase)] = intent
+        for keyword in keywords:
+            self._keywords[normalize_message(keyword)] = intent
+        self._pattern = None
+
+    def _compiled(self):
+        if self._pattern is None and self._keywords:
+            # longest first so "book an appointment" wins over a shorter overlapping keyword;
+            # multi-word keywords tolerate any run of whitespace, single words simple inflections
+            alternatives = sorted(self._keywords, key=len, reverse=True)
+            body = "|".join(r"\s+".join(map(re.escape, k.split())) for k in alternatives)
+            self._pattern = re.compile(rf"\b({body})(?:s|es|ing|ed)?\b")
+        return self._pattern
+
+    def route(self, message):
+        """IntentMatch for a message, or None when nothing registered matches."""
+        text = normalize_message(message)
+        intent = self._commands.get(text)
+        if intent is not None:
+            return IntentMatch(intent, ())
+        pattern = self._compiled()
+        if pattern is None:
+            return None
+        hits = {}
+        for found in pattern.finditer(text):
+            keyword = _SPACES_RE.sub(" ", found.group(1))
+            hits.setdefault(self._keywords[keyword], []).append(keyword)
+        if not hits:
+            return None
+        best = max(hits, key=self._priority.__getitem__)
+        return IntentMatch(best, tuple(hits[best]))
+
+
+def is_emergency(message):
+    """True when the message contains one of EMERGENCY_KEYWORDS ("can't breathe" counts)."""
+    text = normalize_message(message).replace("'", "").replace("’", "")
+    return _EMERGENCY_RE.search(text) is not None
+
+
+def symptom_keywords(match):
+    """The symptom words of a health match, without the generic cue words."""
+    return tuple(k for k in match.keywords if k not in HEALTH_CUES)
+
+
+# process-wide router; app.py registers the chat commands on it
+router = IntentRouter()
+router.register("health", keywords=HEALTH_CUES + HEALTH_SYMPTOMS)
@@ -0,0 +1,272 @@
+# llmGateway.py
+# Single long-lived LLM client shared by every request, with per-call deadlines,
+# bounded concurrency and a circuit breaker. Callers fall back to the rule-based
+# answer whenever complete() raises LLMUnavailable.
+import asyncio
+import os
+import threading
+import time
+from openai import AsyncOpenAI, OpenAI
+
+SYSTEM_PROMPT = "You are a health assistant. Provide concise advice for health queries (in 2–3 sentences)"
+
+
+class LLMUnavailable(Exception):
+    """The LLM could not answer in time (busy, circuit open, timeout or upstream error)."""
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures, lets one probe through after `reset_after` seconds."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold=5, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            # after the cool-down let one probe through; a probe that never reports back
+            # (e.g. an abandoned stream) is replaced after another cool-down
+            if now - self.opened_at >= self.reset_after:
+                self.state = self.HALF_OPEN
+                self.opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LLMGateway:
+    def __init__(self, base_url, api_key, model, timeout=8.0, max_concurrency=8, queue_timeout=0.5,
+                 latency_budget=None, breaker_threshold=5, breaker_reset=30.0, max_tokens=50, temperature=0.7):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        # a call slower than this counts as a breaker failure even if it succeeds
+        self.latency_budget = latency_budget or timeout
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._client = None
+        self._client_lock = threading.Lock()
+        # async side (ASGI mode), created on first use inside the serving event loop
+        self._async_client = None
+        self._async_slots = None
+
+    @classmethod
+    def from_env(cls):
+        budget = os.getenv("LLM_LATENCY_BUDGET")
+        return cls(
+            base_url=os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1"),
+            api_key=os.getenv("OPENAI_API_KEY"),
+            model=os.getenv("LLM_MODEL", "nvidia/nemotron-nano-9b-v2:free"),
+            timeout=float(os.getenv("LLM_TIMEOUT", "8")),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "0.5")),
+            latency_budget=float(budget) if budget else None,
+            breaker_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            breaker_reset=float(os.getenv("LLM_BREAKER_RESET", "30")),
+        )
+
+    @property
+    def client(self):
+        # one client, and so one keep-alive connection pool, for the whole process
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = OpenAI(base_url=self.base_url, api_key=self.api_key,
+                                          timeout=self.timeout, max_retries=0)
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(base_url=self.base_url, api_key=self.api_key,
+                                             timeout=self.timeout, max_retries=0)
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._async_client
+
+    def _messages(self, message):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": message},
+        ]
+
+    def complete(self, message):
+        """Answer a health question or raise LLMUnavailable."""
+        if not self.breaker.allow():
+            raise LLMUnavailable("circuit open")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMUnavailable("too many concurrent LLM calls")
+        started = time.monotonic()
+        try:
+            completion = self.client.chat.completions.create(
+                extra_body={},
+                model=self.model,
+                messages=self._messages(message),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                timeout=self.timeout,
+            )
+            response = completion.choices[0].message.content
+        except Exception as e:
+            self.breaker.record_failure()
+            raise LLMUnavailable(str(e)) from e
+        finally:
+            self._slots.release()
+        self._finish(started, bool(response))
+        return response
+
+    def _finish(self, started, produced):
+        """Record the outcome of a call that returned without raising."""
+        if not produced:
+            self.breaker.record_failure()
+            raise LLMUnavailable("empty completion")
+        if time.monotonic() - started > self.latency_budget:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def stream(self, message):
+        """Yield the answer in chunks as the upstream produces them.
+
+        Raises LLMUnavailable before the first chunk if the call cannot start, or mid-stream
+        if the upstream fails; the concurrency slot is held until the generator is closed.
+        """
+        if not self.breaker.allow():
+            raise LLMUnavailable("circuit open")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMUnavailable("too many concurrent LLM calls")
+        started = time.monotonic()
+        produced = False
+        chunks = None
+        try:
+            chunks = self.client.chat.completions.create(
+                extra_body={},
+                model=self.model,
+                messages=self._messages(message),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                timeout=self.timeout,
+                stream=True,
+            )
+            for chunk in chunks:
+                if time.monotonic() - started > self.timeout:
+                    raise TimeoutError("stream exceeded deadline")
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    produced = True
+                    yield delta
+        except GeneratorExit:
+            # client went away; not the upstream's fault
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            raise LLMUnavailable(str(e)) from e
+        finally:
+            if chunks is not None:
+                chunks.close()
+            self._slots.release()
+        self._finish(started, produced)
+
+    # ---------- async variants used by the ASGI entry point ----------
+
+    async def _acquire_async_slot(self):
+        if not self.breaker.allow():
+            raise LLMUnavailable("circuit open")
+        client = self.async_client
+        try:
+            await asyncio.wait_for(self._async_slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMUnavailable("too many concurrent LLM calls")
+        return client
+
+    async def acomplete(self, message):
+        client = await self._acquire_async_slot()
+        started = time.monotonic()
+        try:
+            completion = await client.chat.completions.create(
+                extra_body={},
+                model=self.model,
+                messages=self._messages(message),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                timeout=self.timeout,
+            )
+            response = completion.choices[0].message.content
+        except Exception as e:
+            self.breaker.record_failure()
+            raise LLMUnavailable(str(e)) from e
+        finally:
+            self._async_slots.release()
+        self._finish(started, bool(response))
+        return response
+
+    async def astream(self, message):
+        client = await self._acquire_async_slot()
+        started = time.monotonic()
+        produced = False
+        chunks = None
+        try:
+            chunks = await client.chat.completions.create(
+                extra_body={},
+                model=self.model,
+                messages=self._messages(message),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                timeout=self.timeout,
+                stream=True,
+            )
+            async for chunk in chunks:
+                if time.monotonic() - started > self.timeout:
+                    raise TimeoutError("stream exceeded deadline")
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    produced = True
+                    yield delta
+        except (GeneratorExit, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            raise LLMUnavailable(str(e)) from e
+        finally:
+            if chunks is not None:
+                await chunks.close()
+            self._async_slots.release()
+        self._finish(started, produced)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Process-wide gateway, configured from the environment on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway.from_env()
+    return _gateway
@@ -0,0 +1,223 @@
+# llmScheduler.py
+# Queue in front of the LLM gateway for non-streamed health answers. Requests wait in
+# bounded priority lanes (emergency, urgent, routine) and a fixed pool of workers
+# drains them, so a burst queues instead of piling up upstream calls. Identical
+# questions queued or in flight together share one upstream call, every request has a
+# deadline, and a request nobody is waiting for any more is dropped before it runs.
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from llmGateway import get_gateway, LLMUnavailable
+from metrics import counter, gauge, histogram
+
+LANES = ("emergency", "urgent", "routine")  # drained strictly in this order
+
+SCHEDULED = counter("healthbot_llm_scheduled_total",
+                    "LLM requests by scheduler outcome: queued, shared, rejected, expired or cancelled.", ("outcome",))
+QUEUE_SECONDS = histogram("healthbot_llm_queue_seconds", "Time an LLM request waited for a worker.", ("lane",))
+
+
+class _Job:
+    __slots__ = ("key", "message", "lane", "deadline", "enqueued", "waiters", "started", "future")
+
+    def __init__(self, key, message, lane, deadline):
+        self.key = key
+        self.message = message
+        self.lane = lane
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.waiters = 1
+        self.started = False
+        self.future = Future()
+
+
+class Ticket:
+    """A caller's claim on a scheduled answer; call result() or aresult() exactly once."""
+
+    def __init__(self, scheduler, job, deadline):
+        self._scheduler = scheduler
+        self._job = job
+        self._deadline = deadline
+        self._released = False
+
+    def _remaining(self):
+        return max(0.0, self._deadline - time.monotonic())
+
+    def result(self):
+        """Block until the answer; raises LLMUnavailable on failure or when the deadline passes."""
+        try:
+            return self._job.future.result(timeout=self._remaining())
+        except FutureTimeout:
+            raise LLMUnavailable("LLM deadline exceeded") from None
+        finally:
+            self.cancel()
+
+    async def aresult(self):
+        """Await the answer; cancelling the awaiting task (client gone) withdraws the request."""
+        # shield: the future may be shared with other callers, so never cancel it from here
+        answer = asyncio.wrap_future(self._job.future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(answer), self._remaining())
+        except asyncio.TimeoutError:
+            raise LLMUnavailable("LLM deadline exceeded") from None
+        finally:
+            # retrieve a late answer or error so asyncio does not report it as never retrieved
+            answer.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self.cancel()
+
+    def cancel(self):
+        """Stop waiting; a queued request with no one left waiting for it never reaches the LLM."""
+        if not self._released:
+            self._released = True
+            self._scheduler._release(self._job)
+
+
+class LLMScheduler:
+    def __init__(self, complete, workers=8, max_queue=64, deadline=10.0):
+        self._complete = complete  # complete(message) -> text; raises LLMUnavailable
+        self.workers = workers
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self._lanes = {lane: deque() for lane in LANES}
+        self._jobs = {}  # key -> _Job queued or running
+        self._queued = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+    @staticmethod
+    def _key(message):
+        return " ".join(message.lower().split())
+
+    def depth(self):
+        return self._queued
+
+    def submit(self, message, lane="routine", deadline=None):
+        """Queue a question and return its Ticket; raises LLMUnavailable when the queue is full."""
+        deadline = time.monotonic() + (deadline or self.deadline)
+        key = self._key(message)
+        with self._cond:
+            self._start_workers()
+            job = self._jobs.get(key)
+            if job is not None:
+                job.waiters += 1
+                job.deadline = max(job.deadline, deadline)
+                if not job.started and LANES.index(lane) < LANES.index(job.lane):
+                    self._lanes[job.lane].remove(job)
+                    job.lane = lane
+                    self._lanes[lane].append(job)
+                SCHEDULED.inc(outcome="shared")
+                return Ticket(self, job, deadline)
+            if self._queued >= self.max_queue:
+                SCHEDULED.inc(outcome="rejected")
+                raise LLMUnavailable("LLM queue full")
+            job = self._jobs[key] = _Job(key, message, lane, deadline)
+            self._lanes[lane].append(job)
+            self._queued += 1
+            SCHEDULED.inc(outcome="queued")
+            self._cond.notify()
+        return Ticket(self, job, deadline)
+
+    def _release(self, job):
+        with self._cond:
+            job.waiters -= 1
+            if job.waiters or job.started or job.future.done():
+                return
+            self._lanes[job.lane].remove(job)
+            self._queued -= 1
+            self._drop(job, "cancelled")
+
+    def _drop(self, job, outcome):
+        # called with the lock held
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+        SCHEDULED.inc(outcome=outcome)
+        if job.waiters:
+            job.future.set_exception(LLMUnavailable(f"LLM request {outcome} before it ran"))
+        else:
+            job.future.cancel()
+
+    def _next_job(self):
+        # called with the lock held; requests past their deadline are dropped unanswered
+        now = time.monotonic()
+        for lane in LANES:
+            queue = self._lanes[lane]
+            while queue:
+                job = queue.popleft()
+                self._queued -= 1
+                if now < job.deadline:
+                    job.started = True
+                    return job
+                self._drop(job, "expired")
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._stopping:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+            QUEUE_SECONDS.observe(time.monotonic() - job.enqueued, lane=job.lane)
+            try:
+                answer, error = self._complete(job.message), None
+            except Exception as e:
+                answer, error = None, e
+            with self._cond:
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(answer)
+
+    def _start_workers(self):
+        # called with the lock held; workers start with the first request
+        if not self._threads:
+            self._stopping = False
+            self._threads = [threading.Thread(target=self._work, name=f"llm-scheduler-{i}", daemon=True)
+                             for i in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=5.0):
+        """Let the workers finish their current call and exit; queued requests still drain first."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler():
+    """Process-wide scheduler configured from the environment, or None when LLM_SCHEDULER=off."""
+    global _scheduler
+    if _scheduler is None and os.getenv("LLM_SCHEDULER", "on") != "off":
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler(
+                    lambda message: get_gateway().complete(message),
+                    workers=int(os.getenv("LLM_SCHEDULER_WORKERS") or get_gateway().max_concurrency),
+                    max_queue=int(os.getenv("LLM_QUEUE_SIZE", "64")),
+                    deadline=float(os.getenv("LLM_DEADLINE", "10")),
+                )
+    return _scheduler
+
+
+def stop_llm_scheduler():
+    if _scheduler is not None:
+        _scheduler.stop()
+
+
+gauge("healthbot_llm_queue_depth", "LLM requests waiting for a scheduler worker.",
+      fn=lambda: _scheduler.depth() if _scheduler is not None else 0)
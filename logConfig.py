@@ -0,0 +1,151 @@
+# logConfig.py
+# Logging setup: records go through a QueueHandler so formatting and stdout writes
+# happen on a background listener thread, never on the request thread. Messages use
+# lazy %-style arguments, PII is masked, hot-path loggers can be sampled, and each
+# logger can have its own level.
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+
+# attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+PII_FIELDS = frozenset({"email", "mobile", "patient", "patient_name", "patient_email", "patient_mobile"})
+_EMAIL_RE = re.compile(r"\b([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9.-]+\.[A-Za-z]{2,})\b")
+_MOBILE_RE = re.compile(r"(?<![\w-])(?:\+?91[\s-]?)?[6-9]\d{4}[\s-]?\d{5}(?![\w-])")
+
+
+def redact(text):
+    """Mask email addresses and Indian mobile numbers: a***@example.com, ******3210."""
+    text = _EMAIL_RE.sub(r"\1***@\2", text)
+    return _MOBILE_RE.sub(lambda m: "******" + re.sub(r"\D", "", m.group())[-4:], text)
+
+
+def _extra_fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields become top-level keys."""
+
+    def __init__(self, redact_pii=True):
+        super().__init__()
+        self.redact_pii = redact_pii
+
+    def format(self, record):
+        message = record.getMessage()
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(message) if self.redact_pii else message,
+            "thread": record.threadName,
+        }
+        for key, value in _extra_fields(record).items():
+            if self.redact_pii and key in PII_FIELDS:
+                value = "<redacted>"
+            elif self.redact_pii and isinstance(value, str):
+                value = redact(value)
+            entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, redact_pii=True):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.redact_pii = redact_pii
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(
+                f"{k}=<redacted>" if self.redact_pii and k in PII_FIELDS else f"{k}={v}" for k, v in fields.items()
+            )
+        return redact(line) if self.redact_pii else line
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of sub-WARNING records from the configured loggers (and their children)."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates  # logger name -> kept fraction
+        self._cache = {}
+
+    def _rate(self, name):
+        rate = self._cache.get(name)
+        if rate is None:
+            rate, probe = 1.0, name
+            while probe:
+                if probe in self.rates:
+                    rate = self.rates[probe]
+                    break
+                probe = probe.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # the stock prepare() formats the message on the calling thread; leave that to the listener
+    def prepare(self, record):
+        return record
+
+
+def parse_mapping(spec, convert=str):
+    """"healthbot.chat=DEBUG, sqlalchemy.engine=WARNING" -> {"healthbot.chat": "DEBUG", ...}"""
+    mapping = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, _, value = part.partition("=")
+            mapping[name.strip()] = convert(value.strip())
+    return mapping
+
+
+_listener = None
+
+
+def configure_logging(app):
+    """Route all logging through one queue and a background listener writing to stdout."""
+    global _listener
+    if _listener is not None:
+        return
+    redact_pii = app.config.get("LOG_REDACT_PII", True)
+    formatter = JsonFormatter(redact_pii) if app.config.get("LOG_FORMAT", "json") == "json" else TextFormatter(redact_pii)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    records = _DeferredQueueHandler(queue.SimpleQueue())
+    rates = parse_mapping(app.config.get("LOG_SAMPLE_RATES"), float)
+    if rates:
+        records.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(records)
+    root.setLevel(app.config.get("LOG_LEVEL", "INFO").upper())
+    for name, level in parse_mapping(app.config.get("LOG_LEVELS")).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    # Flask's own handler would write synchronously; let app.logger propagate to the queue
+    from flask.logging import default_handler
+    app.logger.removeHandler(default_handler)
+
+    _listener = logging.handlers.QueueListener(records.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
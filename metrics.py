@@ -0,0 +1,232 @@
+# metrics.py
+# In-process metrics in the Prometheus text format, served at /metrics.
+# Recording is a dict update under a per-metric lock, cheap enough to leave on in
+# production; gauges backed by a function (queue depth, sessions) are only evaluated
+# when /metrics is scraped.
+import bisect
+import threading
+import time
+from flask import g, request
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._samples()
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Set explicitly, or computed at scrape time from `fn`."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), fn=None):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self):
+        if self.fn is not None:
+            try:
+                return [f"{self.name} {self.fn()}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # per-bucket counts (not cumulative) + the +Inf overflow, then sum
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def _samples(self):
+        with self._lock:
+            items = [(k, list(counts), total) for k, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {round(total, 6)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            # re-registering returns the existing metric, so module reloads are harmless
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+
+def gauge(name, help_text, labelnames=(), fn=None):
+    return REGISTRY.register(Gauge(name, help_text, labelnames, fn))
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+
+# ---------------- application metrics ----------------
+
+CHAT_TURN_SECONDS = histogram("healthbot_chat_turn_seconds", "Chat turn latency by flow and stage.", ("flow", "stage"))
+CHAT_TURN_QUERIES = histogram("healthbot_chat_turn_db_queries", "SQL statements issued per chat turn.",
+                              ("flow", "stage"), QUERY_COUNT_BUCKETS)
+HTTP_REQUEST_SECONDS = histogram("healthbot_http_request_seconds", "HTTP request latency by endpoint.",
+                                 ("endpoint", "status"))
+DB_QUERIES = counter("healthbot_db_queries_total", "SQL statements executed.", ("operation",))
+DB_QUERY_SECONDS = histogram("healthbot_db_query_seconds", "SQL statement latency.", ("operation",))
+LLM_CALL_SECONDS = histogram("healthbot_llm_call_seconds", "LLM call latency (whole stream for streamed answers).",
+                             ("mode", "outcome"))
+LLM_ANSWERS = counter("healthbot_llm_answers_total", "Health answers by source: triage, llm, cache or fallback.", ("source",))
+
+_local = threading.local()
+
+
+def label_turn(flow, stage):
+    """Name the flow and stage the current chat turn belongs to."""
+    g.metrics_turn = (flow, stage)
+
+
+def turn_labels():
+    return getattr(g, "metrics_turn", None)
+
+
+def observe_turn(labels, seconds, queries=None):
+    flow, stage = labels
+    CHAT_TURN_SECONDS.observe(seconds, flow=flow, stage=stage)
+    if queries is not None:
+        CHAT_TURN_QUERIES.observe(queries, flow=flow, stage=stage)
+
+
+def reset_query_count():
+    _local.queries = 0
+
+
+def query_count():
+    return getattr(_local, "queries", 0)
+
+
+def _operation(statement):
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # kept on the execution context, so a failed statement leaves nothing behind
+        if context is not None:
+            context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "metrics_started", None)
+        if started is None:
+            return
+        operation = _operation(statement)
+        DB_QUERIES.inc(operation=operation)
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, operation=operation)
+        _local.queries = getattr(_local, "queries", 0) + 1
+
+
+def init_app(app, db):
+    """Hook request timing and SQL instrumentation into the Flask app."""
+    with app.app_context():
+        instrument_engine(db.engine)
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        reset_query_count()
+
+    @app.after_request
+    def _record_request(response):
+        started = getattr(g, "metrics_started", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or "unknown",
+                                         status=response.status_code)
+            labels = turn_labels()
+            if labels:
+                observe_turn(labels, elapsed, query_count())
+        return response
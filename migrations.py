@@ -0,0 +1,143 @@
+# migrations.py
+# Versioned schema migrations. Each migration runs once, in version order, and is
+# recorded in the schema_version table. Fresh databases are built straight from the
+# models by db.create_all() and only stamped with the latest version.
+import logging
+from datetime import datetime
+from sqlalchemy import inspect, text
+from appUtils import normalize_mobile
+
+log = logging.getLogger("healthbot.migrations")
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function taking a SQLAlchemy connection."""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def head_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(200) NOT NULL, "
+        "applied_at VARCHAR(32) NOT NULL)"
+    ))
+
+
+def current_version(conn):
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def _record(conn, version, description):
+    conn.execute(
+        text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+        {"v": version, "d": description, "t": datetime.utcnow().isoformat(timespec="seconds")},
+    )
+
+
+def stamp_head(conn):
+    """Mark every known migration as applied (used right after creating a fresh schema)."""
+    for version, description, _ in MIGRATIONS:
+        _record(conn, version, description)
+
+
+def apply_pending(conn, logger=None):
+    """Run every migration newer than the recorded version. Returns the versions applied."""
+    applied = []
+    version = current_version(conn)
+    for number, description, fn in MIGRATIONS:
+        if number <= version:
+            continue
+        if logger:
+            logger.info("Applying migration %s: %s", number, description)
+        fn(conn)
+        _record(conn, number, description)
+        applied.append(number)
+    return applied
+
+
+# helpers for migrations so they stay safe to run against partially migrated tables
+def has_column(conn, table, column):
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def has_index(conn, table, index):
+    return any(i["name"] == index for i in inspect(conn).get_indexes(table))
+
+
+def cancel_abandoned_pending(conn):
+    # Pending rows were written when a slot was chosen and never confirmed; the current
+    # flows hold slots in slot_hold instead and cannot confirm them, so they only block slots
+    cancelled = conn.execute(text("UPDATE appointment SET status = 'Cancelled' WHERE status = 'Pending'")).rowcount
+    if cancelled:
+        log.info("Cancelled %s abandoned Pending appointment(s)", cancelled)
+
+
+@migration(1, "unique active slot per doctor")
+def _unique_active_slot(conn):
+    if has_index(conn, "appointment", "uq_appointment_doctor_slot_active"):
+        return
+    # abandoned Pending rows are the usual double bookings; they must not block the upgrade
+    cancel_abandoned_pending(conn)
+    clashes = conn.execute(text(
+        "SELECT doctor_id, appointment_time, COUNT(*) FROM appointment "
+        "WHERE status IN ('Scheduled', 'Confirmed') "
+        "GROUP BY doctor_id, appointment_time HAVING COUNT(*) > 1"
+    )).fetchall()
+    if clashes:
+        raise RuntimeError(
+            "Cannot add unique slot index, double-booked slots exist (doctor_id, time, count): "
+            f"{clashes}. Cancel the duplicates and restart."
+        )
+    conn.execute(text(
+        "CREATE UNIQUE INDEX uq_appointment_doctor_slot_active ON appointment (doctor_id, appointment_time) "
+        "WHERE status IN ('Scheduled', 'Confirmed')"
+    ))
+
+
+@migration(2, "normalized mobile column and lookup indexes")
+def _mobile_last10(conn):
+    if not has_column(conn, "appointment", "mobile_last10"):
+        conn.execute(text("ALTER TABLE appointment ADD COLUMN mobile_last10 VARCHAR(10)"))
+    # backfill in id-ordered batches so large tables are never loaded at once
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, patient_mobile FROM appointment WHERE id > :last_id AND mobile_last10 IS NULL "
+            "ORDER BY id LIMIT 1000"
+        ), {"last_id": last_id}).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE appointment SET mobile_last10 = :mobile WHERE id = :id"),
+            [{"id": row_id, "mobile": normalize_mobile(mobile)} for row_id, mobile in rows],
+        )
+        last_id = rows[-1][0]
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_appointment_mobile_status_time "
+        "ON appointment (mobile_last10, status, appointment_time)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_appointment_doctor_time ON appointment (doctor_id, appointment_time)"
+    ))
+
+
+@migration(3, "cancel abandoned Pending appointments; slots are held by SlotHold now")
+def _cancel_pending(conn):
+    # databases that already ran migration 1 have the old index, which still counted Pending
+    cancel_abandoned_pending(conn)
+    conn.execute(text("DROP INDEX IF EXISTS uq_appointment_doctor_slot_active"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX uq_appointment_doctor_slot_active ON appointment (doctor_id, appointment_time) "
+        "WHERE status IN ('Scheduled', 'Confirmed')"
+    ))
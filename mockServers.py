@@ -0,0 +1,218 @@
+# mockServers.py
+# Local stand-ins for the external providers, for load and failure testing offline:
+# an OpenAI-compatible /v1/chat/completions endpoint (plain and streamed) with
+# configurable latency, token throughput and error rate, and a SendGrid-compatible
+# /v3/mail/send sink that records what it receives. Use them in-process
+# (start_mock_llm / start_sendgrid_sink) or as a standalone process:
+#
+#   python mockServers.py --llm-port 8081 --llm-latency 0.8 --llm-error-rate 0.1 --sendgrid-port 8082
+#   LLM_BASE_URL=http://127.0.0.1:8081/v1 SENDGRID_HOST=http://127.0.0.1:8082 python app.py
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "Rest, drink plenty of fluids and monitor your symptoms. See a doctor if they get worse."
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded HTTP server with request counters; `settings` is read on every request, so it can be tuned live."""
+    daemon_threads = True
+
+    def __init__(self, address, handler, seed=None, **settings):
+        super().__init__(address, handler)
+        self.settings = settings
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        """Count one request; returns True if it should fail (by `error_rate`)."""
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.settings.get("error_rate", 0.0)
+            self.failures += failed
+        return failed
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _read_json(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            return json.loads(body or b"{}")
+        except ValueError:
+            return None
+
+    def _send_json(self, status, payload=None):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fail(self):
+        status = self.server.settings.get("error_status", 500)
+        self._send_json(status, {"error": {"message": f"mock upstream error {status}", "code": status}})
+
+
+# ---------------- OpenAI-compatible chat completions ----------------
+
+class MockLLMHandler(_Handler):
+    def do_POST(self):
+        request = self._read_json()
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        if request is None:
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+        settings = self.server.settings
+        time.sleep(settings.get("latency", 0.0))
+        if self.server.count_request():
+            self._fail()
+            return
+        tokens = self._tokens(request.get("max_tokens"))
+        if request.get("stream"):
+            self._stream(request, tokens)
+        else:
+            self._pause(len(tokens))
+            self._send_json(200, {
+                "id": "mock-completion", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(tokens)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+
+    def _tokens(self, max_tokens):
+        # one "token" per word, keeping the spaces so the pieces join back into the reply
+        words = self.server.settings.get("reply", DEFAULT_REPLY).split(" ")
+        tokens = [w if i == 0 else " " + w for i, w in enumerate(words)]
+        return tokens[:max_tokens] if max_tokens else tokens
+
+    def _pause(self, count):
+        rate = self.server.settings.get("tokens_per_second", 0)
+        if rate:
+            time.sleep(count / rate)
+
+    def _stream(self, request, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        model = request.get("model", "mock")
+        for i, token in enumerate(tokens):
+            self._pause(1)
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            self._event({"id": "mock-completion", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        self._event({"id": "mock-completion", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+        self.wfile.flush()
+
+
+def start_mock_llm(latency=0.0, tokens_per_second=0, error_rate=0.0, error_status=500, reply=DEFAULT_REPLY,
+                   seed=None, host="127.0.0.1", port=0):
+    """Serve the mock LLM on a background thread; point LLM_BASE_URL at `server.url + "/v1"`."""
+    server = MockServer((host, port), MockLLMHandler, seed=seed, latency=latency,
+                        tokens_per_second=tokens_per_second, error_rate=error_rate,
+                        error_status=error_status, reply=reply)
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+# ---------------- SendGrid-compatible sink ----------------
+
+class SendGridSinkHandler(_Handler):
+    def do_POST(self):
+        payload = self._read_json()
+        if self.path.rstrip("/") != "/v3/mail/send":
+            self._send_json(404, {"errors": [{"message": "not found"}]})
+            return
+        if payload is None:
+            self._send_json(400, {"errors": [{"message": "invalid JSON"}]})
+            return
+        time.sleep(self.server.settings.get("latency", 0.0))
+        if self.server.count_request():
+            self._fail()
+            return
+        self.server.messages.append(payload)
+        self._send_json(202)
+
+    def do_GET(self):
+        # lets a standalone run be inspected: curl http://127.0.0.1:8082/messages
+        if self.path.rstrip("/") == "/messages":
+            self._send_json(200, list(self.server.messages))
+        else:
+            self._send_json(404, {"errors": [{"message": "not found"}]})
+
+
+def start_sendgrid_sink(latency=0.0, error_rate=0.0, error_status=500, keep=1000, seed=None,
+                        host="127.0.0.1", port=0):
+    """Serve the SendGrid sink on a background thread; set SENDGRID_HOST to `server.url`.
+
+    The last `keep` accepted messages are available as `server.messages`.
+    """
+    server = MockServer((host, port), SendGridSinkHandler, seed=seed, latency=latency,
+                        error_rate=error_rate, error_status=error_status)
+    server.messages = deque(maxlen=keep)
+    threading.Thread(target=server.serve_forever, name="sendgrid-sink", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the mock LLM and SendGrid servers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--llm-port", type=int, default=8081)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds before the first byte")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0, help="0 sends the whole answer at once")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of requests that fail, 0-1")
+    parser.add_argument("--llm-error-status", type=int, default=500, help="e.g. 429 to mimic provider throttling")
+    parser.add_argument("--sendgrid-port", type=int, default=8082, help="0 disables the sink")
+    parser.add_argument("--sendgrid-latency", type=float, default=0.05)
+    parser.add_argument("--sendgrid-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, help="make the injected failures repeatable")
+    args = parser.parse_args(argv)
+
+    servers = [start_mock_llm(args.llm_latency, args.llm_tokens_per_second, args.llm_error_rate,
+                              args.llm_error_status, seed=args.seed, host=args.host, port=args.llm_port)]
+    print(f"LLM_BASE_URL={servers[0].url}/v1")
+    if args.sendgrid_port:
+        servers.append(start_sendgrid_sink(args.sendgrid_latency, args.sendgrid_error_rate, seed=args.seed,
+                                           host=args.host, port=args.sendgrid_port))
+        print(f"SENDGRID_HOST={servers[1].url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
 # models.py
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 import uuid
+from datetime import datetime
+from appUtils import normalize_mobile
 
 db = SQLAlchemy()
 
+# appointment statuses that occupy a doctor's slot (older "Pending" rows are cancelled by migration 3)
+ACTIVE_STATUSES = ("Scheduled", "Confirmed")
+_ACTIVE_STATUS_SQL = "status IN ('Scheduled', 'Confirmed')"
+
+def new_serial_number():
+    return str(uuid.uuid4())
+
 # database model for DOCTOR table
 class Doctor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -11,15 +21,78 @@ class Doctor(db.Model):
     speciality = db.Column(db.String(120), nullable=False)
     consultation_fee = db.Column(db.Float, nullable=False)
 
+# database model for ROSTER_VERSION table: one row, bumped with every doctor roster change
+# so each worker process can tell when its cached doctor catalog is stale
+class RosterVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# database model for DOCTOR_SHIFT table (working hours, one row per shift)
+class DoctorShift(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False, index=True)
+    name = db.Column(db.String(20), nullable=False)  # "Morning", "Evening"
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    slot_minutes = db.Column(db.Integer, nullable=False, default=60)
+
 # database model for APPOINTMENT table
 class Appointment(db.Model):
+    # a doctor slot can be held by only one active appointment
+    __table_args__ = (
+        db.Index(
+            "uq_appointment_doctor_slot_active", "doctor_id", "appointment_time", unique=True,
+            sqlite_where=db.text(_ACTIVE_STATUS_SQL), postgresql_where=db.text(_ACTIVE_STATUS_SQL),
+        ),
+        # lookups by phone (cancel/reschedule) and per-doctor day listings
+        db.Index("ix_appointment_mobile_status_time", "mobile_last10", "status", "appointment_time"),
+        db.Index("ix_appointment_doctor_time", "doctor_id", "appointment_time"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    serial_number = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    serial_number = db.Column(db.String(36), unique=True, nullable=False, default=new_serial_number)
     patient_name = db.Column(db.String(120), nullable=False)
     patient_email = db.Column(db.String(120), nullable=False)
     patient_mobile = db.Column(db.String(20), nullable=False)
+    mobile_last10 = db.Column(db.String(10))  # normalized copy of patient_mobile, set on write
     speciality = db.Column(db.String(200), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
     appointment_time = db.Column(db.DateTime, nullable=False)
     fee = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(50), default="Scheduled")
\ No newline at end of file
+    status = db.Column(db.String(50), default="Scheduled")
+
+    # doctor is always shown next to an appointment, so load it in the same query
+    doctor = db.relationship("Doctor", lazy="joined", innerjoin=True)
+
+    @validates("patient_mobile")
+    def _sync_mobile_last10(self, key, value):
+        self.mobile_last10 = normalize_mobile(value)
+        return value
+
+# database model for SLOT_HOLD table: a doctor slot soft-locked while the patient confirms
+class SlotHold(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint("doctor_id", "slot_time", name="uq_slot_hold_doctor_slot"),
+        {"sqlite_autoincrement": True},  # hold ids identify their owner, so never reuse one
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
+    slot_time = db.Column(db.DateTime, nullable=False)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id'))  # set when rescheduling
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # UTC
+
+# database model for EMAIL_OUTBOX table, drained by the background email worker
+class EmailOutbox(db.Model):
+    __table_args__ = (db.Index("ix_email_outbox_due", "status", "next_attempt_at"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
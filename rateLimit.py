@@ -0,0 +1,189 @@
+# rateLimit.py
+# Burst protection for /chat. Token buckets (per user, per client IP and per user for
+# LLM-bound health answers) live in a pluggable backend: 'memory' per process, or
+# 'sqlite' shared by every worker process using the same file. TurnGate runs one turn
+# at a time per user and lets identical in-flight messages (a double-click) share the
+# first one's reply instead of advancing the flow twice.
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from metrics import counter
+
+RATE_LIMITED = counter("healthbot_rate_limited_total", "Requests refused by a rate-limit rule.", ("rule",))
+
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + (now - updated) * rate)
+
+
+class MemoryBuckets:
+    """Token buckets in a bounded LRU dict; the least recently used key is evicted first."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1.0):
+        """Spend `cost` tokens; returns 0.0 if allowed, else seconds until it would be."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = _refill(tokens, updated, now, rate, burst)
+            wait = 0.0 if tokens >= cost else (cost - tokens) / rate
+            if not wait:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite table, updated under BEGIN IMMEDIATE so processes never double-spend."""
+
+    def __init__(self, path, sweep_interval=300, idle_seconds=3600):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self.idle_seconds = idle_seconds  # a bucket untouched this long is full again; drop it
+        self._local = threading.local()
+        self._next_sweep = time.time() + sweep_interval
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS rate_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, cost=1.0):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_bucket WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(*(row or (burst, now)), now, rate, burst)
+            wait = 0.0 if tokens >= cost else (cost - tokens) / rate
+            if not wait:
+                tokens -= cost
+            conn.execute("INSERT OR REPLACE INTO rate_bucket (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            conn.execute("DELETE FROM rate_bucket WHERE updated < ?", (now - self.idle_seconds,))
+        return wait
+
+
+class RateLimiter:
+    """Named token-bucket rules over one backend: rules = {"user": (per_minute, burst), ...}."""
+
+    def __init__(self, backend, rules):
+        self.backend = backend
+        self.rules = {name: (per_minute / 60.0, float(burst)) for name, (per_minute, burst) in rules.items()}
+
+    def hit(self, rule, key):
+        """Count one request; returns 0.0 if allowed, else the seconds to wait."""
+        if self.backend is None or rule not in self.rules:
+            return 0.0
+        rate, burst = self.rules[rule]
+        wait = self.backend.take(f"{rule}:{key}", rate, burst)
+        if wait:
+            RATE_LIMITED.inc(rule=rule)
+        return wait
+
+
+def create_rate_limiter(app):
+    """Build the limiter selected by app.config['RATE_LIMIT_BACKEND'] ('memory', 'sqlite' or 'off')."""
+    kind = app.config.get("RATE_LIMIT_BACKEND", "memory")
+    if kind == "off":
+        backend = None
+    elif kind == "memory":
+        backend = MemoryBuckets()
+    elif kind == "sqlite":
+        path = app.config.get("RATE_LIMIT_SQLITE_PATH") or os.path.join(app.instance_path, "ratelimit.db")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        backend = SQLiteBuckets(path)
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {kind}")
+    return RateLimiter(backend, {
+        "user": (app.config.get("RATE_LIMIT_USER_PER_MINUTE", 60), app.config.get("RATE_LIMIT_USER_BURST", 20)),
+        "ip": (app.config.get("RATE_LIMIT_IP_PER_MINUTE", 300), app.config.get("RATE_LIMIT_IP_BURST", 100)),
+        "llm": (app.config.get("RATE_LIMIT_LLM_PER_MINUTE", 10), app.config.get("RATE_LIMIT_LLM_BURST", 5)),
+    })
+
+
+# ---------------- per-user serialization and coalescing ----------------
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class TurnGate:
+    """One turn at a time per user; identical concurrent messages share the first reply.
+
+    Works within a process; locks are reference counted so idle users hold no memory.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._user_locks = {}  # user_id -> [lock, users waiting or running]
+        self._inflight = {}  # (user_id, message) -> _Call
+
+    @contextmanager
+    def serialized(self, user_id):
+        with self._lock:
+            entry = self._user_locks.setdefault(user_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._user_locks[user_id]
+
+    def run(self, user_id, message, fn):
+        """Run fn() serialized for the user, or wait for an identical in-flight call and share its result.
+
+        The result is handed to every caller, so it must be safe to share (text, bytes, a tuple).
+        """
+        key = (user_id, message)
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            with self.serialized(user_id):
+                call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
@@ -0,0 +1,221 @@
+# responseCache.py
+# Cache of LLM answers for health queries. Messages are normalized into a token set;
+# an exact key lookup catches "I have fever" / "i have a fever!!", and an optional
+# MinHash/LSH tier catches close paraphrases ("fever and headache" / "headache, fever").
+import atexit
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+# negations ("no", "not") are deliberately kept: "no fever" must not match "fever"
+STOPWORDS = frozenset("""
+a an the i im i'm me my mine we our you your he she it its they them this that these those
+am is are was were be been being have has had having do does did doing got get getting
+and or but if so of at by for with about to from in on up down out over again then just
+very really quite some any lot bit little please pls kindly can could would should will
+what whats how hows why when where which who whom help tell know think feel feeling since
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_MERSENNE = (1 << 61) - 1
+
+
+def _stem(token):
+    # crude suffix stripping so "hurts"/"hurting"/"hurt" share a token
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[: -len(suffix)]
+    return token
+
+
+def normalize_query(message):
+    """Lowercased, punctuation-free, stopword-free token set of a message."""
+    return frozenset(_stem(t) for t in _TOKEN_RE.findall(message.lower()) if t not in STOPWORDS)
+
+
+def _key(tokens):
+    return " ".join(sorted(tokens))
+
+
+class MinHasher:
+    def __init__(self, num_perm=32, bands=8, seed=7):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+        self.bands = bands
+        self.rows = num_perm // bands
+
+    def signature(self, tokens):
+        hashes = [zlib.crc32(t.encode()) for t in tokens]
+        return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in self.params)
+
+    def band_keys(self, signature):
+        r = self.rows
+        return [(i, signature[i * r:(i + 1) * r]) for i in range(self.bands)]
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM responses with hit/miss counters and optional JSON persistence."""
+
+    def __init__(self, max_entries=1000, ttl=86400, similarity=0.8, path=None, save_every=50):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Jaccard threshold for the paraphrase tier; 0 disables it
+        self.similarity = similarity
+        self.path = path
+        self.save_every = save_every
+        self.hasher = MinHasher() if similarity else None
+        self._entries = OrderedDict()  # key -> (expires_at, tokens, response)
+        self._buckets = {}  # LSH band -> set of keys
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------- lookups ----------
+
+    def get(self, message):
+        tokens = normalize_query(message)
+        if not tokens:
+            return None
+        key = _key(tokens)
+        now = time.time()
+        with self._lock:
+            response = self._lookup(key, now)
+            if response is not None:
+                self.hits += 1
+                return response
+            if self.hasher:
+                key = self._similar_key(tokens, now)
+                if key is not None:
+                    self.similar_hits += 1
+                    return self._lookup(key, now)
+            self.misses += 1
+            return None
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _similar_key(self, tokens, now):
+        candidates = set()
+        for band in self.hasher.band_keys(self.hasher.signature(tokens)):
+            candidates |= self._buckets.get(band, set())
+        best, best_score = None, self.similarity
+        for key in candidates:
+            expires_at, cached_tokens, _ = self._entries[key]
+            if expires_at <= now:
+                continue
+            score = len(tokens & cached_tokens) / len(tokens | cached_tokens)
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    # ---------- writes ----------
+
+    def put(self, message, response):
+        tokens = normalize_query(message)
+        if tokens and response:
+            self._insert(_key(tokens), tokens, response, time.time() + self.ttl)
+
+    def _insert(self, key, tokens, response, expires_at):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, tokens, response)
+            if self.hasher:
+                for band in self.hasher.band_keys(self.hasher.signature(tokens)):
+                    self._buckets.setdefault(band, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._dirty += 1
+            should_save = self.path and self._dirty >= self.save_every
+        if should_save:
+            self.save()
+
+    def _remove(self, key):
+        _, tokens, _ = self._entries.pop(key)
+        if self.hasher:
+            for band in self.hasher.band_keys(self.hasher.signature(tokens)):
+                keys = self._buckets.get(band)
+                if keys:
+                    keys.discard(key)
+                    if not keys:
+                        del self._buckets[band]
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    # ---------- persistence ----------
+
+    def save(self):
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            rows = [
+                {"key": key, "response": response, "expires_at": expires_at}
+                for key, (expires_at, _, response) in self._entries.items()
+                if expires_at > now
+            ]
+            self._dirty = 0
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(rows, fh, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path, encoding="utf-8") as fh:
+            rows = json.load(fh)
+        now = time.time()
+        loaded = 0
+        for row in rows:
+            if row["expires_at"] > now:
+                self._insert(row["key"], frozenset(row["key"].split()), row["response"], row["expires_at"])
+                loaded += 1
+        self._dirty = 0
+        return loaded
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide cache configured from the environment, or None when LLM_CACHE_ENABLED=0."""
+    global _cache
+    if _cache is None and os.getenv("LLM_CACHE_ENABLED", "1") == "1":
+        with _cache_lock:
+            if _cache is None:
+                cache = ResponseCache(
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+                    ttl=int(os.getenv("LLM_CACHE_TTL", "86400")),
+                    similarity=float(os.getenv("LLM_CACHE_SIMILARITY", "0.8")),
+                    path=os.getenv("LLM_CACHE_PATH") or None,
+                )
+                cache.load()
+                if cache.path:
+                    atexit.register(cache.save)
+                _cache = cache
+    return _cache
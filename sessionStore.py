@@ -0,0 +1,273 @@
+# sessionStore.py
+# Conversation state storage keyed by user_id. The memory backend is per-process;
+# the sqlite backend is shared by every worker process pointing at the same file.
+# Both keep each session as a compact binary record (see encode_session).
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from datetime import date
+from typing import Optional, get_origin
+
+
+@dataclass(slots=True)
+class SessionState:
+    """One user's place in a flow. Holds only ids and primitives, never ORM objects."""
+    flow: str
+    stage: str
+    name: str = ""
+    email: str = ""
+    mobile: str = ""
+    speciality: str = ""
+    doctor_id: int = 0
+    doctor_ids: tuple[int, ...] = ()
+    appointment_id: int = 0
+    appointment_ids: tuple[int, ...] = ()
+    date: Optional[date] = None
+    shift: str = ""
+    shift_choice: str = ""
+    slot_starts: tuple[int, ...] = ()  # open slot start times, minutes after midnight
+    time: str = ""  # label of the chosen slot
+    slot_start: int = -1  # start of the chosen slot, minutes after midnight
+    hold_id: int = 0  # SlotHold keeping the chosen slot until confirmation
+
+
+class SessionTooLarge(ValueError):
+    """An encoded session exceeded the store's byte budget."""
+
+
+# ---------------- binary codec ----------------
+# Layout: version byte, uint32 bitmask of fields that differ from their default, then
+# each of those fields in declaration order: str as uint16 length + UTF-8, int as int32,
+# date as uint32 ordinal, tuple of ints as uint16 count + int32 items.
+
+_CODEC_VERSION = 1
+_HEADER = struct.Struct("<BI")
+_U16, _I32, _U32 = struct.Struct("<H"), struct.Struct("<i"), struct.Struct("<I")
+
+
+def _field_kind(field):
+    if field.type is str:
+        return "s"
+    if field.type is int:
+        return "i"
+    if get_origin(field.type) is tuple:
+        return "t"
+    return "d"
+
+
+_FIELDS = [(f.name, _field_kind(f), f.default) for f in fields(SessionState)]
+
+
+def encode_session(state, max_bytes=None):
+    mask = 0
+    parts = []
+    for bit, (name, kind, default) in enumerate(_FIELDS):
+        value = getattr(state, name)
+        if value == default:
+            continue
+        mask |= 1 << bit
+        if kind == "s":
+            raw = value.encode()
+            parts += (_U16.pack(len(raw)), raw)
+        elif kind == "i":
+            parts.append(_I32.pack(value))
+        elif kind == "d":
+            parts.append(_U32.pack(value.toordinal()))
+        else:
+            parts += (_U16.pack(len(value)), struct.pack(f"<{len(value)}i", *value))
+    data = _HEADER.pack(_CODEC_VERSION, mask) + b"".join(parts)
+    if max_bytes and len(data) > max_bytes:
+        raise SessionTooLarge(f"session is {len(data)} bytes, budget is {max_bytes}")
+    return data
+
+
+def decode_session(data):
+    """Inverse of encode_session; None for records written by another codec version."""
+    version, mask = _HEADER.unpack_from(data)
+    if version != _CODEC_VERSION:
+        return None
+    offset = _HEADER.size
+    values = {}
+    for bit, (name, kind, _) in enumerate(_FIELDS):
+        if not mask & (1 << bit):
+            continue
+        if kind == "s":
+            (size,) = _U16.unpack_from(data, offset)
+            offset += 2
+            values[name] = bytes(data[offset:offset + size]).decode()
+            offset += size
+        elif kind == "i":
+            (values[name],) = _I32.unpack_from(data, offset)
+            offset += 4
+        elif kind == "d":
+            values[name] = date.fromordinal(_U32.unpack_from(data, offset)[0])
+            offset += 4
+        else:
+            (count,) = _U16.unpack_from(data, offset)
+            values[name] = struct.unpack_from(f"<{count}i", data, offset + 2)
+            offset += 2 + 4 * count
+    return SessionState(**values)
+
+
+class SessionStore:
+    """Interface used by app.chat and the appointment flows.
+
+    get() returns a SessionState (or None); callers mutate it and call save().
+    save() raises SessionTooLarge when the encoded record exceeds `max_bytes`.
+    """
+
+    def get(self, user_id):
+        raise NotImplementedError
+
+    def save(self, user_id, session):
+        raise NotImplementedError
+
+    def delete(self, user_id):
+        raise NotImplementedError
+
+    def sweep(self):
+        """Drop expired sessions and return how many were removed."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Bounded LRU map with a sliding TTL.
+
+    Expired entries are dropped lazily on read and by a sweep that runs at most
+    once every `sweep_interval` seconds from save().
+    """
+
+    def __init__(self, max_entries=10000, ttl=1800, sweep_interval=60, max_bytes=1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= now:
+                del self._data[user_id]
+                return None
+            self._data[user_id] = (now + self.ttl, data)
+            self._data.move_to_end(user_id)
+        return decode_session(data)
+
+    def save(self, user_id, session):
+        # stored encoded: a few dozen bytes per user instead of a live object graph
+        data = encode_session(session, self.max_bytes)
+        now = time.monotonic()
+        with self._lock:
+            self._data[user_id] = (now + self.ttl, data)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        if now >= self._next_sweep:
+            self.sweep()
+
+    def delete(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            self._next_sweep = now + self.sweep_interval
+            expired = [uid for uid, (expires_at, _) in self._data.items() if expires_at <= now]
+            for uid in expired:
+                del self._data[uid]
+        return len(expired)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions serialized into a SQLite table so every worker process sees the same state; sliding TTL."""
+
+    def __init__(self, path, ttl=1800, sweep_interval=60, max_bytes=1024):
+        self.path = path
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._next_sweep = time.time() + sweep_interval
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_session ("
+            "user_id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_chat_session_expires ON chat_session (expires_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, user_id):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT data FROM chat_session WHERE user_id = ? AND expires_at > ?",
+            (user_id, now),
+        ).fetchone()
+        if row is None or not isinstance(row[0], bytes):
+            return None  # missing, or a JSON row from before the binary codec
+        # slide the TTL on read, like MemorySessionStore
+        conn.execute("UPDATE chat_session SET expires_at = ? WHERE user_id = ?", (now + self.ttl, user_id))
+        return decode_session(row[0])
+
+    def save(self, user_id, session):
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO chat_session (user_id, data, expires_at) VALUES (?, ?, ?)",
+            (user_id, encode_session(session, self.max_bytes), now + self.ttl),
+        )
+        if now >= self._next_sweep:
+            self.sweep()
+
+    def delete(self, user_id):
+        self._conn().execute("DELETE FROM chat_session WHERE user_id = ?", (user_id,))
+
+    def sweep(self):
+        now = time.time()
+        self._next_sweep = now + self.sweep_interval
+        return self._conn().execute("DELETE FROM chat_session WHERE expires_at <= ?", (now,)).rowcount
+
+    def __len__(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM chat_session WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+def create_session_store(app):
+    """Build the store selected by app.config['SESSION_BACKEND'] ('memory' or 'sqlite')."""
+    backend = app.config.get("SESSION_BACKEND", "memory")
+    ttl = int(app.config.get("SESSION_TTL_SECONDS", 1800))
+    max_bytes = int(app.config.get("SESSION_MAX_BYTES", 1024))
+    if backend == "memory":
+        return MemorySessionStore(max_entries=int(app.config.get("SESSION_MAX_ENTRIES", 10000)), ttl=ttl,
+                                  max_bytes=max_bytes)
+    if backend == "sqlite":
+        path = app.config.get("SESSION_SQLITE_PATH") or os.path.join(app.instance_path, "sessions.db")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SQLiteSessionStore(path, ttl=ttl, max_bytes=max_bytes)
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,123 @@
+# slotHolds.py
+# Expiring holds on doctor slots. Choosing a slot inserts a small SlotHold row that keeps
+# the slot out of other patients' lists for SLOT_HOLD_MINUTES; confirming writes the
+# appointment and deletes the hold in one transaction. An abandoned hold just lapses and
+# is reclaimed by the sweeper, so no appointment row is written until the patient confirms.
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from models import db, Appointment, SlotHold, ACTIVE_STATUSES
+
+DEFAULT_HOLD_MINUTES = 10
+
+
+def hold_minutes():
+    return current_app.config.get("SLOT_HOLD_MINUTES", DEFAULT_HOLD_MINUTES)
+
+
+def _insert_hold(doctor_id, slot_time, appointment_id, expires_at):
+    hold = SlotHold(doctor_id=doctor_id, slot_time=slot_time, appointment_id=appointment_id, expires_at=expires_at)
+    db.session.add(hold)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    return hold
+
+
+def place_hold(doctor_id, slot_time, appointment_id=None):
+    """Hold a slot; returns the SlotHold, or None if it is booked or held by someone else."""
+    booked = db.session.query(Appointment.id).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.appointment_time == slot_time,
+        Appointment.status.in_(ACTIVE_STATUSES),
+    ).first()
+    if booked:
+        return None
+    now = datetime.utcnow()
+    expires_at = now + timedelta(minutes=hold_minutes())
+    hold = _insert_hold(doctor_id, slot_time, appointment_id, expires_at)
+    if hold is None:
+        # the slot is held; take it over only if that hold has lapsed and was not swept yet
+        lapsed = db.session.execute(delete(SlotHold).where(
+            SlotHold.doctor_id == doctor_id, SlotHold.slot_time == slot_time, SlotHold.expires_at <= now,
+        ))
+        if not lapsed.rowcount:
+            db.session.rollback()
+            return None
+        hold = _insert_hold(doctor_id, slot_time, appointment_id, expires_at)
+    return hold
+
+
+def claim_hold(hold_id, doctor_id, slot_time, appointment_id=None):
+    """The caller's hold for a slot, re-placed if it lapsed and was swept; None if the slot went elsewhere."""
+    hold = db.session.get(SlotHold, hold_id) if hold_id else None
+    if hold is not None and hold.doctor_id == doctor_id and hold.slot_time == slot_time:
+        return hold
+    return place_hold(doctor_id, slot_time, appointment_id)
+
+
+def convert_hold(hold, appointment):
+    """Write `appointment` (new, or moved onto the held slot) in place of the hold.
+
+    Everything the caller staged beforehand (e.g. the confirmation email) commits in the
+    same short transaction. Returns False, rolled back, if an active appointment took
+    the slot in the meantime.
+    """
+    db.session.add(appointment)
+    db.session.delete(hold)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    return True
+
+
+def release_hold(hold_id):
+    if hold_id:
+        db.session.execute(delete(SlotHold).where(SlotHold.id == hold_id))
+        db.session.commit()
+
+
+def sweep_expired_holds(now=None):
+    """Delete lapsed holds; returns how many were removed."""
+    result = db.session.execute(delete(SlotHold).where(SlotHold.expires_at <= (now or datetime.utcnow())))
+    db.session.commit()
+    return result.rowcount
+
+
+class HoldSweeper:
+    """Background thread that reclaims lapsed holds every `interval` seconds."""
+
+    def __init__(self, app, interval=60):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, name="slot-hold-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.app.app_context():
+                    swept = sweep_expired_holds()
+                if swept:
+                    self.app.logger.debug("Reclaimed %s expired slot holds", swept)
+            except Exception:
+                self.app.logger.exception("Slot hold sweep failed")
@@ -0,0 +1,135 @@
+# specialityRecommender.py
+# Suggests the speciality to book from a free-text symptoms message. A multinomial
+# naive Bayes model over TF-IDF weighted words is trained offline from the triage
+# knowledge base (data/symptoms.json) plus data/speciality_examples.json, and the
+# compact artifact in data/speciality_model.json is loaded once per process.
+#
+#   python specialityRecommender.py              # retrain and rewrite the artifact
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+from responseCache import normalize_query
+from triageEngine import SYMPTOMS_FILE
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+EXAMPLES_FILE = os.path.join(DATA_DIR, "speciality_examples.json")
+MODEL_FILE = os.path.join(DATA_DIR, "speciality_model.json")
+
+MODEL_VERSION = 1
+
+log = logging.getLogger("healthbot.recommender")
+
+
+# ---------------- training ----------------
+
+def training_documents(symptoms_path=SYMPTOMS_FILE, examples_path=EXAMPLES_FILE):
+    """(text, speciality) pairs: every knowledge-base term and name, then the extra examples."""
+    with open(symptoms_path, encoding="utf-8") as fh:
+        knowledge = json.load(fh)
+    documents = [(text, s["speciality"]) for s in knowledge["symptoms"] for text in [s["name"], *s["terms"]]]
+    with open(examples_path, encoding="utf-8") as fh:
+        examples = json.load(fh)
+    documents += [(text, speciality) for speciality, texts in examples.items() for text in texts]
+    return documents
+
+
+def train(documents, alpha=0.5):
+    """Fit the model; words are weighted by IDF so ones shared by every speciality ("pain") count less."""
+    docs = [(normalize_query(text), label) for text, label in documents]
+    classes = sorted({label for _, label in docs})
+    doc_freq = {}
+    for words, _ in docs:
+        for word in words:
+            doc_freq[word] = doc_freq.get(word, 0) + 1
+    idf = {w: math.log((1 + len(docs)) / (1 + n)) + 1 for w, n in doc_freq.items()}
+
+    counts = {label: {} for label in classes}
+    class_docs = {label: 0 for label in classes}
+    for words, label in docs:
+        class_docs[label] += 1
+        for word in words:
+            counts[label][word] = counts[label].get(word, 0.0) + idf[word]
+
+    vocabulary = sorted(idf)
+    totals = {label: sum(counts[label].values()) + alpha * len(vocabulary) for label in classes}
+    return {
+        "version": MODEL_VERSION,
+        "classes": classes,
+        "priors": [round(math.log(class_docs[label] / len(docs)), 4) for label in classes],
+        "words": {
+            word: [round(math.log((counts[label].get(word, 0.0) + alpha) / totals[label]), 4) for label in classes]
+            for word in vocabulary
+        },
+    }
+
+
+# ---------------- scoring ----------------
+
+class SpecialityRecommender:
+    def __init__(self, model):
+        if model.get("version") != MODEL_VERSION:
+            raise ValueError(f"Unsupported speciality model version: {model.get('version')}")
+        self.classes = tuple(model["classes"])
+        self.priors = model["priors"]
+        self.words = model["words"]
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        with open(path, encoding="utf-8") as fh:
+            return cls(json.load(fh))
+
+    def rank(self, message):
+        """[(speciality, probability), ...] best first; empty when no word of the message is known."""
+        known = [self.words[w] for w in normalize_query(message) if w in self.words]
+        if not known:
+            return []
+        scores = [prior + sum(likelihoods[i] for likelihoods in known) for i, prior in enumerate(self.priors)]
+        top = max(scores)
+        weights = [math.exp(s - top) for s in scores]
+        total = sum(weights)
+        return sorted(((c, w / total) for c, w in zip(self.classes, weights)), key=lambda p: p[1], reverse=True)
+
+
+_recommender = None
+_recommender_lock = threading.Lock()
+
+
+def get_recommender():
+    """Process-wide recommender, or None when the model file is missing or unreadable."""
+    global _recommender
+    if _recommender is None:
+        with _recommender_lock:
+            if _recommender is None:
+                path = os.getenv("RECOMMENDER_MODEL_PATH") or MODEL_FILE
+                try:
+                    _recommender = SpecialityRecommender.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    log.warning("Speciality recommender disabled: %s", e)
+                    _recommender = False
+    return _recommender or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the symptom-to-speciality model.")
+    parser.add_argument("--symptoms", default=SYMPTOMS_FILE)
+    parser.add_argument("--examples", default=EXAMPLES_FILE)
+    parser.add_argument("--alpha", type=float, default=0.5, help="Laplace smoothing.")
+    parser.add_argument("--output", "-o", default=MODEL_FILE)
+    args = parser.parse_args(argv)
+
+    documents = training_documents(args.symptoms, args.examples)
+    model = train(documents, args.alpha)
+    recommender = SpecialityRecommender(model)
+    correct = sum(recommender.rank(text)[0][0] == label for text, label in documents)
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(model, fh, separators=(",", ":"))
+    print(f"Trained on {len(documents)} examples, {len(model['words'])} words, "
+          f"{len(model['classes'])} specialities; training accuracy {correct / len(documents):.1%}.")
+    print(f"Wrote {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
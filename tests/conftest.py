@@ -0,0 +1,32 @@
+# conftest.py
+# The app reads its configuration when app.py is imported, so point it at a throwaway
+# database and the local mock LLM (mockServers.py) before any test imports it.
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mockServers import start_mock_llm  # noqa: E402
+
+_workdir = tempfile.mkdtemp(prefix="healthbot-tests-")
+mock_llm = start_mock_llm(seed=0)
+
+os.environ.update({
+    "DATABASE_URL": "sqlite:///" + os.path.join(_workdir, "test.db"),
+    "LLM_BASE_URL": mock_llm.url + "/v1",
+    "OPENAI_API_KEY": "test",
+    "LLM_CACHE_ENABLED": "0",
+    "RATE_LIMIT_BACKEND": "off",
+    "EMAIL_TRANSPORT": "file",
+    "EMAIL_FILE_PATH": os.path.join(_workdir, "sent_emails.jsonl"),
+    "EMAIL_WORKER_ENABLED": "0",
+})
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
@@ -0,0 +1,51 @@
+import io
+import json
+from sqlalchemy import select
+
+
+def test_bad_working_hours_are_reported_by_line_and_the_batch_still_commits():
+    from app import app
+    from adminApi import import_doctors
+    from dbBootstrap import bootstrap_database
+    from models import db, Doctor, DoctorShift
+
+    rows = [
+        {"name": "Dr. Good One", "speciality": "ENT", "consultation_fee": 600,
+         "working_hours": {"Morning": ["08:00", "10:00"]}},
+        {"name": "Dr. Bad Hours", "speciality": "ENT", "consultation_fee": 600,
+         "working_hours": {"Morning": ["9am", "12:00"]}},
+        {"name": "Dr. Backwards", "speciality": "ENT", "consultation_fee": 600,
+         "working_hours": {"Evening": ["18:00", "16:00"]}},
+        {"name": "Dr. Good Two", "speciality": "ENT", "consultation_fee": 650},
+    ]
+    stream = io.StringIO("".join(json.dumps(row) + "\n" for row in rows))
+    with app.app_context():
+        bootstrap_database(app)
+        report = import_doctors(stream, "jsonl")
+        assert report["imported"] == 2
+        assert [e["line"] for e in report["errors"]] == [2, 3]
+        names = set(db.session.scalars(select(Doctor.name).where(Doctor.speciality == "ENT")))
+        assert names == {"Dr. Good One", "Dr. Good Two"}
+        good = db.session.scalar(select(Doctor.id).where(Doctor.name == "Dr. Good One"))
+        assert [s.name for s in db.session.scalars(select(DoctorShift).where(DoctorShift.doctor_id == good))] == ["Morning"]
+
+
+def test_malformed_json_lines_are_reported_and_the_rest_imports():
+    from app import app
+    from adminApi import import_doctors
+    from dbBootstrap import bootstrap_database
+    from models import db, Doctor
+
+    lines = [
+        json.dumps({"name": "Dr. Before", "speciality": "Pulmonologist", "consultation_fee": 700}),
+        '{"name": "Dr. Broken", ',
+        '["a"]',
+        json.dumps({"name": "Dr. After", "speciality": "Pulmonologist", "consultation_fee": 700}),
+    ]
+    with app.app_context():
+        bootstrap_database(app)
+        report = import_doctors(io.StringIO("\n".join(lines) + "\n"), "jsonl")
+        assert report["imported"] == 2
+        assert [e["line"] for e in report["errors"]] == [2, 3]
+        names = set(db.session.scalars(select(Doctor.name).where(Doctor.speciality == "Pulmonologist")))
+        assert names == {"Dr. Before", "Dr. After"}
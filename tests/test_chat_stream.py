@@ -0,0 +1,37 @@
+import json
+from mockServers import DEFAULT_REPLY
+
+# nothing in the triage knowledge base explains this, so it goes to the LLM
+LLM_QUESTION = "I have had a stiff neck and dry eyes for 3 days"
+
+
+def _stream_text(client, user_id, message):
+    response = client.post("/chat/stream", json={"user_id": user_id, "message": message})
+    assert response.status_code == 200
+    events = [json.loads(line[len("data: "):]) for line in response.get_data(as_text=True).splitlines()
+              if line.startswith("data: ")]
+    assert events[-1] == {"type": "done"}
+    return "".join(e["text"] for e in events if e["type"] in ("delta", "message"))
+
+
+def _chat(client, user_id, message):
+    return client.post("/chat", json={"user_id": user_id, "message": message}).get_json()["response"]
+
+
+def test_stream_answers_llm_question_without_session(client):
+    assert _stream_text(client, "stream-no-session", LLM_QUESTION) == DEFAULT_REPLY
+
+
+def test_stream_answers_llm_question_inside_a_flow(client):
+    assert "To cancel your appointment" in _chat(client, "stream-in-flow", "cancel")
+    assert _stream_text(client, "stream-in-flow", LLM_QUESTION) == DEFAULT_REPLY
+
+
+def test_chat_and_stream_give_the_same_llm_answer(client):
+    assert _chat(client, "plain-chat", LLM_QUESTION) == DEFAULT_REPLY
+
+
+def test_symptoms_at_booking_step_go_to_the_flow(client):
+    for message in ("book appointment", "Asha Rao", "asha@example.com", "9876543210"):
+        _chat(client, "booking-symptoms", message)
+    assert "recommend a Dermatologist" in _stream_text(client, "booking-symptoms", "itchy rash on my arms")
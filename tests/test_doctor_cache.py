@@ -0,0 +1,47 @@
+import sqlite3
+import time
+from sqlalchemy import select
+import doctorCache
+
+
+def test_catalog_picks_up_doctors_added_by_another_process(monkeypatch):
+    from app import app
+    from dbBootstrap import bootstrap_database
+    from doctorCache import get_catalog, roster_version
+    from models import db
+
+    with app.test_request_context():
+        bootstrap_database(app)
+        before = get_catalog()
+        path = db.engine.url.database
+        version = roster_version()
+
+    # what `flask import-doctors` in its own process leaves behind
+    other = sqlite3.connect(path)
+    with other:
+        other.execute("INSERT INTO doctor (name, speciality, consultation_fee) VALUES ('Dr. Elsewhere', 'ENT', 700)")
+        other.execute("UPDATE roster_version SET version = version + 1")
+    other.close()
+
+    with app.test_request_context():
+        assert get_catalog() is before  # still inside the check interval
+        monkeypatch.setattr(doctorCache, "_next_check", time.monotonic())
+        catalog = get_catalog()
+        assert catalog.version == version + 1
+        assert "Dr. Elsewhere" in {d.name for d in catalog.doctors.values()}
+
+
+def test_orm_roster_change_moves_the_shared_version():
+    from app import app
+    from dbBootstrap import bootstrap_database
+    from doctorCache import get_catalog, roster_version
+    from models import db, Doctor
+
+    with app.test_request_context():
+        bootstrap_database(app)
+        version = roster_version()
+        doctor = db.session.scalar(select(Doctor).order_by(Doctor.id))
+        doctor.consultation_fee += 1
+        db.session.commit()
+        assert roster_version() == version + 1
+        assert get_catalog().doctors[doctor.id].consultation_fee == doctor.consultation_fee
@@ -0,0 +1,60 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, text
+import migrations
+
+SLOT = datetime(2030, 1, 7, 9, 0)
+
+
+def _baseline_db():
+    # appointment table as it was before any migration existed
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE appointment (id INTEGER PRIMARY KEY, serial_number VARCHAR(36) NOT NULL UNIQUE, "
+            "patient_name VARCHAR(120) NOT NULL, patient_email VARCHAR(120) NOT NULL, "
+            "patient_mobile VARCHAR(20) NOT NULL, speciality VARCHAR(200) NOT NULL, doctor_id INTEGER NOT NULL, "
+            "appointment_time DATETIME NOT NULL, fee FLOAT NOT NULL, status VARCHAR(50))"
+        ))
+    return engine
+
+
+def _book(conn, serial, status):
+    conn.execute(text(
+        "INSERT INTO appointment (serial_number, patient_name, patient_email, patient_mobile, speciality, "
+        "doctor_id, appointment_time, fee, status) "
+        "VALUES (:serial, 'A', 'a@example.com', '+91 98765 43210', 'Cardiologist', 1, :t, 500, :status)"
+    ), {"serial": serial, "t": SLOT, "status": status})
+
+
+def test_upgrade_cancels_pending_rows_that_clash_with_a_booking():
+    engine = _baseline_db()
+    with engine.begin() as conn:
+        _book(conn, "s1", "Pending")
+        _book(conn, "s2", "Confirmed")
+        migrations.ensure_version_table(conn)
+        assert migrations.apply_pending(conn) == [v for v, _, _ in migrations.MIGRATIONS]
+        statuses = dict(conn.execute(text("SELECT serial_number, status FROM appointment")).fetchall())
+    assert statuses == {"s1": "Cancelled", "s2": "Confirmed"}
+
+
+def test_upgrade_still_refuses_real_double_bookings():
+    engine = _baseline_db()
+    with engine.begin() as conn:
+        _book(conn, "s1", "Scheduled")
+        _book(conn, "s2", "Confirmed")
+        migrations.ensure_version_table(conn)
+        with pytest.raises(RuntimeError, match="double-booked"):
+            migrations.apply_pending(conn)
+
+
+def test_pending_rows_stop_blocking_slots_after_migration_3():
+    engine = _baseline_db()
+    with engine.begin() as conn:
+        conn.execute(text("CREATE UNIQUE INDEX uq_appointment_doctor_slot_active ON appointment "
+                          "(doctor_id, appointment_time) WHERE status IN ('Pending', 'Scheduled', 'Confirmed')"))
+        _book(conn, "s1", "Pending")
+        migrations._cancel_pending(conn)
+        assert conn.execute(text("SELECT status FROM appointment")).scalar() == "Cancelled"
+        # the freed slot can be booked again
+        _book(conn, "s2", "Confirmed")
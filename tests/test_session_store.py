@@ -0,0 +1,16 @@
+import time
+from sessionStore import SQLiteSessionStore, SessionState
+
+
+def test_sqlite_store_slides_ttl_on_read(tmp_path, monkeypatch):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=100)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    store.save("u1", SessionState(flow="booking", stage="ask_name"))
+    monkeypatch.setattr(time, "time", lambda: now + 80)
+    assert store.get("u1") is not None
+    # still alive 160s after the save, because the read at +80s extended it
+    monkeypatch.setattr(time, "time", lambda: now + 160)
+    assert store.get("u1") is not None
+    monkeypatch.setattr(time, "time", lambda: now + 300)
+    assert store.get("u1") is None
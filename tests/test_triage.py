@@ -0,0 +1,52 @@
+import pytest
+from triageEngine import TriageEngine
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return TriageEngine.load()
+
+
+@pytest.mark.parametrize("message, symptom", [
+    ("no appetite, chest pain since morning", "chest_pain"),
+    ("not well, chest pain", "chest_pain"),
+    ("not able to breathe", "breathing"),
+    ("I don't have chest pain, just acidity", "chest_pain"),  # when in doubt, escalate
+])
+def test_negation_never_hides_an_emergency(engine, message, symptom):
+    triage = engine.assess(message)
+    assert triage.urgency == "emergency"
+    assert symptom in [s.id for s in triage.symptoms]
+
+
+@pytest.mark.parametrize("message, present, absent", [
+    ("no fever but severe headache", "headache", "fever"),
+    ("no fever, just a cough", "cough", "fever"),
+    ("no high fever and a runny nose", "cold", "fever"),
+])
+def test_negation_covers_only_the_next_term(engine, message, present, absent):
+    ids = [s.id for s in engine.assess(message).symptoms]
+    assert present in ids and absent not in ids
+
+
+@pytest.mark.parametrize("message, emergency", [
+    ("bleeding heavily", True),
+    ("I think it's a blood clot", True),
+    ("I can't breathe", True),
+    ("mild headache since morning", False),
+])
+def test_fallback_without_triage_still_flags_emergencies(monkeypatch, message, emergency):
+    import appUtils
+    monkeypatch.setattr(appUtils, "get_triage_engine", lambda: None)  # TRIAGE_ENABLED=0
+    reply = appUtils.rule_based_health_response(message)
+    assert (appUtils.EMERGENCY_TEXT in reply) is emergency
+
+
+@pytest.mark.parametrize("message, lane", [
+    ("bleeding heavily", "emergency"),
+    ("what should I eat for a cold", "routine"),
+])
+def test_llm_lane_without_triage(monkeypatch, message, lane):
+    import appUtils
+    monkeypatch.setattr(appUtils, "get_triage_engine", lambda: None)
+    assert appUtils._llm_lane(message) == lane
@@ -0,0 +1,163 @@
+# triageEngine.py
+# Offline first tier for health queries. The symptom knowledge base (data/symptoms.json)
+# is loaded once into an inverted index from each word to the symptom terms containing
+# it, so assessing a message is a few dict lookups per word. Matched symptoms give the
+# urgency, the speciality to book and canned advice. A message made mostly of words the
+# knowledge base cannot explain gets a low confidence and is left to the LLM.
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+from responseCache import STOPWORDS
+
+SYMPTOMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "symptoms.json")
+
+URGENCY_LEVELS = ("routine", "urgent", "emergency")
+
+Symptom = namedtuple("Symptom", ["id", "name", "speciality", "urgency", "weight", "advice"])
+# symptoms are ranked by score; `confident` means the message can be answered without the LLM
+Triage = namedtuple("Triage", ["symptoms", "urgency", "speciality", "confidence", "confident"])
+
+NO_TRIAGE = Triage((), None, None, 0.0, False)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CLAUSE_RE = re.compile(r"[,.;:!?()\n]|\b(?:and|but|with)\b")
+_SUFFIXES = ("s", "es", "ing", "ed", "d")
+_MAX_TERM_WORDS = 3
+
+
+def tokenize(text):
+    """Lowercase words with apostrophes dropped: "Can't breathe" -> ["cant", "breathe"]."""
+    return _TOKEN_RE.findall(text.lower().replace("'", "").replace("’", ""))
+
+
+def clauses(text):
+    """Word lists per clause; punctuation and "and"/"but"/"with" end a negation's reach."""
+    return [tokenize(part) for part in _CLAUSE_RE.split(text.lower())]
+
+
+class TriageEngine:
+    def __init__(self, knowledge, min_confidence=0.6):
+        self.min_confidence = min_confidence
+        self.negators = frozenset(knowledge.get("negators", ()))
+        # words that carry no symptom ("since", "days", "severe"); they never lower confidence
+        self.filler = STOPWORDS | frozenset(knowledge.get("filler", ()))
+        self.symptoms = []
+        self.terms = []  # (symptom index, frozenset of words)
+        self._term_words = set()  # word sets of all terms, to find the term a negation covers
+        self._index = {}  # word -> [term index, ...]
+        phrases = []
+        for entry in knowledge["symptoms"]:
+            if entry["urgency"] not in URGENCY_LEVELS:
+                raise ValueError(f"Unknown urgency {entry['urgency']!r} for symptom {entry['id']}")
+            symptom_index = len(self.symptoms)
+            self.symptoms.append(Symptom(entry["id"], entry["name"], entry["speciality"], entry["urgency"],
+                                         entry.get("weight", 1), entry["advice"]))
+            for term in entry["terms"]:
+                words = frozenset(w for w in tokenize(term) if w not in STOPWORDS)
+                for word in words:
+                    self._index.setdefault(word, []).append(len(self.terms))
+                self.terms.append((symptom_index, words))
+                self._term_words.add(words)
+                phrases.append(term)
+        self.phrases = tuple(phrases)
+
+    @classmethod
+    def load(cls, path=SYMPTOMS_FILE, min_confidence=0.6):
+        with open(path, encoding="utf-8") as fh:
+            return cls(json.load(fh), min_confidence)
+
+    def _canonical(self, word):
+        # map simple inflections onto the indexed form: "headaches" -> "headache", "sneezing" -> "sneeze"
+        if word in self._index:
+            return word
+        for suffix in _SUFFIXES:
+            if word.endswith(suffix) and len(word) > len(suffix) + 2:
+                stem = word[:-len(suffix)]
+                if stem in self._index:
+                    return stem
+                if stem + "e" in self._index:
+                    return stem + "e"
+        return word
+
+    def _negated_span(self, words, start):
+        """Number of words from `start` a negation covers: the one term right after it."""
+        skip = start
+        while skip < len(words) and words[skip] in self.filler:
+            skip += 1  # "no high fever"
+        for size in range(_MAX_TERM_WORDS, 1, -1):
+            if frozenset(words[skip:skip + size]) in self._term_words:
+                return skip - start + size
+        return skip - start + 1
+
+    def _words(self, message):
+        """(words present, content words that should be explained, every word including negated ones)."""
+        present, content, everything = set(), [], set()
+        for clause in clauses(message):
+            words = [self._canonical(w) for w in clause if w not in STOPWORDS]
+            everything.update(words)
+            i = 0
+            while i < len(words):
+                if words[i] in self.negators:
+                    # "no fever, but cough": only the term right after the negator is denied
+                    i += 1 + self._negated_span(words, i + 1)
+                    continue
+                present.add(words[i])
+                if words[i] not in self.filler:
+                    content.append(words[i])
+                i += 1
+        return present, content, everything
+
+    def _matched_terms(self, words, emergency_only=False):
+        hits = {}
+        for word in words:
+            for term in self._index.get(word, ()):
+                hits[term] = hits.get(term, 0) + 1
+        return {t for t, n in hits.items() if n == len(self.terms[t][1])
+                and (not emergency_only or self.symptoms[self.terms[t][0]].urgency == "emergency")}
+
+    def assess(self, message):
+        present, content, everything = self._words(message)
+        # negation never hides an emergency ("I don't think it's a heart attack" still escalates)
+        matched = self._matched_terms(present) | self._matched_terms(everything, emergency_only=True)
+        # a term inside a longer matched one ("vomiting" in "vomiting blood") does not count on its own
+        matched = [t for t in matched if not any(self.terms[t][1] < self.terms[o][1] for o in matched)]
+        if not matched:
+            return NO_TRIAGE
+
+        scores = {}
+        for term in matched:
+            symptom_index, words = self.terms[term]
+            scores[symptom_index] = scores.get(symptom_index, 0) + self.symptoms[symptom_index].weight * len(words)
+        symptoms = tuple(self.symptoms[i] for i in sorted(scores, key=lambda i: (-scores[i], i)))
+        by_speciality = {}
+        for i, score in scores.items():
+            by_speciality[self.symptoms[i].speciality] = by_speciality.get(self.symptoms[i].speciality, 0) + score
+
+        covered = frozenset().union(*(self.terms[t][1] for t in matched))
+        confidence = sum(w in covered for w in content) / len(content) if content else 1.0
+        return Triage(
+            symptoms=symptoms,
+            urgency=max((s.urgency for s in symptoms), key=URGENCY_LEVELS.index),
+            speciality=max(by_speciality, key=by_speciality.get),
+            confidence=round(confidence, 2),
+            confident=confidence >= self.min_confidence,
+        )
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_triage_engine():
+    """Process-wide engine configured from the environment, or None when TRIAGE_ENABLED=0."""
+    global _engine
+    if _engine is None and os.getenv("TRIAGE_ENABLED", "1") == "1":
+        with _engine_lock:
+            if _engine is None:
+                _engine = TriageEngine.load(
+                    os.getenv("TRIAGE_DATA_PATH") or SYMPTOMS_FILE,
+                    min_confidence=float(os.getenv("TRIAGE_MIN_CONFIDENCE", "0.6")),
+                )
+    return _engine